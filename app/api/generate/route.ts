@@ -1,13 +1,26 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { writeFile, mkdir } from 'fs/promises';
-import { spawn } from 'child_process';
-import path from 'path';
+import { submitJob, getJob, getJobEvents, waitForJob, jobUrls, GenerationJob } from '@/lib/generation-worker';
+
+function jobResponse(job: GenerationJob) {
+    return {
+        jobId: job.id,
+        status: job.status,
+        stage: job.stage,
+        progress: job.progress,
+        qualityMetrics: job.quality_metrics,
+        visualizationsStatus: job.visualizations_status,
+        timings: job.timings,
+        peakRssMb: job.peak_rss_mb,
+        ...jobUrls(job)
+    };
+}
 
 export async function POST(request: NextRequest) {
     try {
         const formData = await request.formData();
         const file = formData.get('file');
         const numSamples = formData.get('numSamples');
+        const runAsync = formData.get('async') === 'true';
 
         if (!file || !(file instanceof Blob)) {
             return NextResponse.json({ error: 'No valid file uploaded' }, { status: 400 });
@@ -17,67 +30,102 @@ export async function POST(request: NextRequest) {
             return NextResponse.json({ error: 'Invalid number of samples' }, { status: 400 });
         }
 
-        // Create necessary directories
-        const uploadsDir = path.join(process.cwd(), 'uploads');
-        const publicDir = path.join(process.cwd(), 'public');
-        await mkdir(uploadsDir, { recursive: true });
-        await mkdir(publicDir, { recursive: true });
-
-        // Save the uploaded file
-        const filePath = path.join(uploadsDir, 'dataset.csv');
-        const arrayBuffer = await file.arrayBuffer();
-        await writeFile(filePath, new Uint8Array(arrayBuffer));
-
-        // Run the Python script with the specified number of samples
-        return new Promise((resolve) => {
-            const pythonProcess = spawn('python', [
-                'app/ml/GMM_Model.py',
-                '--input', filePath,
-                '--samples', numSamples.toString(),
-                '--public_dir', publicDir
-            ]);
+        const filename = file instanceof File && file.name ? file.name : 'dataset.csv';
+        const submitted = await submitJob(file, filename, Number(numSamples));
 
-            let stdoutData = '';
-            let stderrData = '';
+        // Async callers poll GET /api/generate?jobId=... for progress, or
+        // subscribe to GET /api/generate?jobId=...&stream=1 for live stage events
+        if (runAsync) {
+            return NextResponse.json(jobResponse(submitted), { status: 202 });
+        }
 
-            pythonProcess.stdout.on('data', (data) => {
-                stdoutData += data.toString();
-                console.log('Python stdout:', data.toString());
+        const job = await waitForJob(submitted.id);
+        if (job.status === 'done') {
+            return NextResponse.json({
+                success: true,
+                message: 'Synthetic data generated successfully',
+                ...jobResponse(job)
             });
+        }
+        return NextResponse.json({
+            error: 'Failed to generate synthetic data',
+            details: job.error || 'Unknown error occurred',
+            ...jobResponse(job)
+        }, { status: 500 });
+    } catch (error) {
+        console.error('Error in generate route:', error);
+        return NextResponse.json({
+            error: 'Internal server error',
+            details: error instanceof Error ? error.message : String(error)
+        }, { status: 500 });
+    }
+}
 
-            pythonProcess.stderr.on('data', (data) => {
-                stderrData += data.toString();
-                console.error('Python stderr:', data.toString());
-            });
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
 
-            pythonProcess.on('close', (code) => {
-                console.log('Python process exited with code:', code);
-                
-                if (code === 0) {
-                    resolve(NextResponse.json({
-                        success: true,
-                        message: 'Synthetic data generated successfully',
-                        stdout: stdoutData,
-                        visualizations: {
-                            distributions: '/distributions.png',
-                            correlations: '/correlation_matrix.png',
-                            bic_aic: '/bic_aic_plot.png'
-                        }
-                    }));
-                } else {
-                    resolve(NextResponse.json({
-                        error: 'Failed to generate synthetic data',
-                        details: stderrData || 'Unknown error occurred',
-                        stdout: stdoutData
-                    }, { status: 500 }));
+// Server-sent events: every instrumentation event of the job, then the final job status
+function streamJobEvents(jobId: string, pollMs = 500) {
+    const encoder = new TextEncoder();
+    let cancelled = false;
+    const stream = new ReadableStream({
+        async start(controller) {
+            const send = (name: string, payload: unknown) =>
+                controller.enqueue(encoder.encode(`event: ${name}\ndata: ${JSON.stringify(payload)}\n\n`));
+            try {
+                let since = 0;
+                while (!cancelled) {
+                    const job = await getJob(jobId);
+                    const result = await getJobEvents(jobId, since);
+                    if (!job || !result) {
+                        send('error', { error: 'Unknown job' });
+                        break;
+                    }
+                    result.events.forEach((event) => send('stage', event));
+                    since = result.next;
+                    if (job.status === 'done' || job.status === 'failed') {
+                        send('job', jobResponse(job));
+                        break;
+                    }
+                    await sleep(pollMs);
                 }
-            });
-        });
+            } catch (error) {
+                send('error', { error: error instanceof Error ? error.message : String(error) });
+            }
+            controller.close();
+        },
+        cancel() {
+            cancelled = true;
+        }
+    });
+    return new Response(stream, {
+        headers: {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache, no-transform',
+            'Connection': 'keep-alive'
+        }
+    });
+}
+
+export async function GET(request: NextRequest) {
+    try {
+        const jobId = request.nextUrl.searchParams.get('jobId');
+        if (!jobId) {
+            return NextResponse.json({ error: 'Missing jobId' }, { status: 400 });
+        }
+        if (request.nextUrl.searchParams.get('stream') === '1') {
+            return streamJobEvents(jobId);
+        }
+
+        const job = await getJob(jobId);
+        if (!job) {
+            return NextResponse.json({ error: 'Unknown job' }, { status: 404 });
+        }
+        return NextResponse.json(jobResponse(job));
     } catch (error) {
-        console.error('Error in generate route:', error);
-        return NextResponse.json({ 
+        console.error('Error in generate status route:', error);
+        return NextResponse.json({
             error: 'Internal server error',
             details: error instanceof Error ? error.message : String(error)
         }, { status: 500 });
     }
-} 
\ No newline at end of file
+}
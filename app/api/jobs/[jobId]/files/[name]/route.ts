@@ -0,0 +1,37 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { readFile } from 'fs/promises';
+import path from 'path';
+import { jobFilePath } from '@/lib/generation-worker';
+
+const CONTENT_TYPES: Record<string, string> = {
+    '.csv': 'text/csv',
+    '.parquet': 'application/vnd.apache.parquet',
+    '.arrow': 'application/vnd.apache.arrow.file',
+    '.png': 'image/png',
+    '.json': 'application/json'
+};
+
+// Serves a job's synthetic data and plots, which are written after the build and so cannot live in public/
+export async function GET(
+    request: NextRequest,
+    { params }: { params: Promise<{ jobId: string; name: string }> }
+) {
+    const { jobId, name } = await params;
+    const filePath = jobFilePath(jobId, name);
+    if (!filePath) {
+        return NextResponse.json({ error: 'File not found' }, { status: 404 });
+    }
+    try {
+        const body = await readFile(filePath);
+        return new NextResponse(body, {
+            headers: {
+                'Content-Type': CONTENT_TYPES[path.extname(name).toLowerCase()] || 'application/octet-stream',
+                'Content-Disposition': `inline; filename*=UTF-8''${encodeURIComponent(name)}`,
+                'Cache-Control': 'no-store'
+            }
+        });
+    } catch (error) {
+        console.error('Error serving job file:', error);
+        return NextResponse.json({ error: 'File not found' }, { status: 404 });
+    }
+}
@@ -1,18 +1,21 @@
-import { NextResponse } from 'next/server';
-import { existsSync } from 'fs';
-import path from 'path';
+import { NextRequest, NextResponse } from 'next/server';
+import { jobFilePath, jobFileUrl } from '@/lib/generation-worker';
 
-export async function GET() {
+// Plots of one job; callers pass the jobId returned by /api/generate so users never see each other's results
+export async function GET(request: NextRequest) {
     try {
-        const publicDir = path.join(process.cwd(), 'public');
-        const distributionsPath = path.join(publicDir, 'distributions.png');
-        const correlationsPath = path.join(publicDir, 'correlation_matrix.png');
-        const bicAicPath = path.join(publicDir, 'bic_aic_plot.png');
+        const jobId = request.nextUrl.searchParams.get('jobId');
+        if (!jobId) {
+            return NextResponse.json({ error: 'Missing jobId' }, { status: 400 });
+        }
+
+        const visualizationUrl = (file: string) =>
+            jobFilePath(jobId, file) ? jobFileUrl(jobId, file) : '';
 
         const visualizations = {
-            distributions: existsSync(distributionsPath) ? '/distributions.png' : '',
-            correlations: existsSync(correlationsPath) ? '/correlation_matrix.png' : '',
-            bic_aic: existsSync(bicAicPath) ? '/bic_aic_plot.png' : ''
+            distributions: visualizationUrl('distributions.png'),
+            correlations: visualizationUrl('correlation_matrix.png'),
+            bic_aic: visualizationUrl('bic_aic_plot.png')
         };
 
         return NextResponse.json({
@@ -21,9 +24,9 @@ export async function GET() {
         });
     } catch (error) {
         console.error('Error:', error);
-        return NextResponse.json({ 
+        return NextResponse.json({
             error: 'Internal server error',
             details: error instanceof Error ? error.message : String(error)
         }, { status: 500 });
     }
-} 
\ No newline at end of file
+}
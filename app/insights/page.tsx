@@ -28,7 +28,7 @@ const demoData = {
 }
 
 export default function Insights() {
-  const { dataset, generatedData } = useData()
+  const { dataset, generatedData, generationJobId } = useData()
   const [visualizations, setVisualizations] = useState({
     distributions: '',
     correlations: '',
@@ -39,7 +39,7 @@ export default function Insights() {
     // Check if visualizations exist and update state
     const checkVisualizations = async () => {
       try {
-        const response = await fetch('/api/visualizations');
+        const response = await fetch(`/api/visualizations?jobId=${encodeURIComponent(generationJobId!)}`);
         const data = await response.json();
         if (data.success) {
           setVisualizations(data.visualizations);
@@ -49,10 +49,10 @@ export default function Insights() {
       }
     };
 
-    if (dataset && generatedData) {
+    if (dataset && generatedData && generationJobId) {
       checkVisualizations();
     }
-  }, [dataset, generatedData]);
+  }, [dataset, generatedData, generationJobId]);
 
   if (!dataset || !generatedData) {
     return (
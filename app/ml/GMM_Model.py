@@ -1,22 +1,29 @@
 import os
+import sys
+import copy
+import hashlib
 import numpy as np 
 import pandas as pd  
-import seaborn as sns
-from scipy.stats import ks_2samp
-import matplotlib.pyplot as plt 
-from sklearn.mixture import GaussianMixture
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.cluster import KMeans
 import argparse
+from functools import partial
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+import model_store
+from instrumentation import emit, stage, event_sink, json_lines_sink, profiled
+from dataset_profile import profile_dataset, profile_correlation
+from table_io import (read_table, table_format, is_typed_format, output_path_for,
+                      open_table_writer, write_table, restore_dtypes)
+from evaluation import (evaluate_metrics, render_evaluation_plots, init_stream_metrics,
+                        update_stream_metrics, finalize_stream_metrics)
 
 # ================= IDENTIFY FEATURE TYPES ================================
-def identify_feature_types(data, discrete_threshold=0.05, max_unique=10):
+def identify_feature_types(data, discrete_threshold=0.05, max_unique=10, profile=None):
     continuous_features, discrete_features = [], []
     for column in data.columns:
         if not pd.api.types.is_numeric_dtype(data[column]) or data[column].dtype == 'bool':
             discrete_features.append(column)
         else:
-            unique_values = data[column].nunique()
+            unique_values = profile[column].n_unique if profile is not None else data[column].nunique()
             unique_ratio = unique_values / len(data)
             if unique_ratio < discrete_threshold or unique_values <= max_unique:
                 discrete_features.append(column)
@@ -26,8 +33,21 @@ def identify_feature_types(data, discrete_threshold=0.05, max_unique=10):
 # ========================================================================
 
 # ================= DETECT MODALITY ======================================
-def detect_modality(data, feature, bins=50):
-    """Detects if a feature is multimodal by analyzing its histogram."""
+def detect_modality(data, feature, bins=50, profile=None):
+    """Detects if a feature is multimodal by analyzing its histogram.
+
+    With a `DatasetProfile` built with the same `bins`, the precomputed histogram
+    is used instead of rescanning `data`.
+    """
+    if profile is not None and profile.bins == bins and feature in profile:
+        column = profile[feature]
+        if column.n_valid < int(0.1 * profile.n_rows):
+            print(f"Skipping '{feature}' as it was removed due to excessive NaNs.")
+            return False, 1
+        if column.hist is None or column.n_valid < 2:
+            print(f"Skipping modality detection for '{feature}' due to insufficient data.")
+            return False, 1
+        return _modality_from_histogram(column.hist)
     
     # Drop columns where more than 90% of values are NaN
     data = data.dropna(thresh=int(0.1 * len(data)), axis=1)
@@ -46,38 +66,201 @@ def detect_modality(data, feature, bins=50):
         return False, 1  # Treat as unimodal
     
     # Compute histogram only if valid data exists
-    hist, bin_edges = np.histogram(feature_data, bins=bins)
-    
+    hist, _ = np.histogram(feature_data, bins=bins)
+    return _modality_from_histogram(hist)
+
+
+def _modality_from_histogram(hist):
+    significant_peaks = _significant_peaks(hist)
+    if len(significant_peaks) >= 2:
+        return True, len(significant_peaks)
+    return False, 1  # Default: Treat as unimodal
+
+
+def _significant_peaks(hist):
+    """Bin indices of the significant histogram peaks, or none if the histogram is unimodal."""
     # Detect peaks in the histogram
-    peaks = []
-    for i in range(1, len(hist) - 1):
-        if hist[i] > hist[i - 1] and hist[i] > hist[i + 1]:
-            peaks.append((bin_edges[i], hist[i]))
+    hist = np.asarray(hist)
+    inner = hist[1:-1]
+    peak_bins = np.flatnonzero((inner > hist[:-2]) & (inner > hist[2:])) + 1
     
     # Determine if multimodal based on significant peaks
-    if len(peaks) > 2:
-        max_height = max(hist)
-        significant_peaks = [p for p in peaks if p[1] > 0.2 * max_height]
-        if len(significant_peaks) >= 2:
-            return True, len(significant_peaks)
-    
-    return False, 1  # Default: Treat as unimodal
+    if len(peak_bins) > 2:
+        significant = peak_bins[hist[peak_bins] > 0.2 * hist.max()]
+        if len(significant) >= 2:
+            return significant
+    return np.array([], dtype=int)
+
+
+def detect_modalities(data, features, bins=50, profile=None):
+    """Batched modality detection: {feature: centers of its significant histogram peaks}.
+
+    Unimodal features map to an empty array. Histograms come from the profile
+    when it was built with the same `bins`; the remaining features are binned
+    together in a single pass over the frame.
+    """
+    histograms = {}
+    missing = []
+    for feature in features:
+        column = profile[feature] if profile is not None and profile.bins == bins and feature in profile else None
+        if column is not None and column.hist is not None:
+            histograms[feature] = (column.hist, column.bin_edges)
+        else:
+            missing.append(feature)
+
+    if missing:
+        values = data[missing].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        lows, highs = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+        widths = np.where(highs > lows, highs - lows, 1.0)
+        idx = np.clip(((values - lows) / widths * bins).astype(np.int64, copy=False), 0, bins - 1)
+        offsets = np.arange(len(missing)) * bins
+        counts = np.bincount((idx + offsets)[valid], minlength=len(missing) * bins).reshape(len(missing), bins)
+        for i, feature in enumerate(missing):
+            histograms[feature] = (counts[i], np.linspace(lows[i], highs[i], bins + 1))
+
+    min_valid = int(0.1 * len(data))
+    peaks = {}
+    for feature in features:
+        hist, edges = histograms[feature]
+        if hist.sum() < max(2, min_valid):
+            peaks[feature] = np.array([])
+            continue
+        peak_bins = _significant_peaks(hist)
+        peaks[feature] = (edges[peak_bins] + edges[peak_bins + 1]) / 2
+    return peaks
+
+
+def peak_anchors(scaled_data, peak_positions):
+    """Full-width anchor points for EM: the mean of the rows lying near each histogram peak.
+
+    `peak_positions` maps column indices of `scaled_data` to peak centers on the
+    same (scaled) axis.
+    """
+    anchors = []
+    for col, centers in peak_positions.items():
+        if len(centers) < 2:
+            continue
+        values = scaled_data[:, col]
+        # Each row belongs to its nearest peak; rows close to a peak define the anchor
+        nearest = np.abs(values[:, None] - centers[None, :]).argmin(axis=1)
+        radius = np.diff(np.sort(centers)).min() / 4
+        for k, center in enumerate(centers):
+            rows = (nearest == k) & (np.abs(values - center) <= radius)
+            if rows.any():
+                anchors.append(scaled_data[rows].mean(axis=0))
+    return np.array(anchors).reshape(-1, scaled_data.shape[1])
 # ========================================================================
 
 # ================= SELECTING BEST COMPONENT BASED ON BIC ======================================
-def select_best_component(data, max_components=10, plot=True, public_dir=None):
+def initial_parameters(data, n, anchors=None, random_state=42, max_iter=20):
+    """Warm-start means and weights for an n-component GMM.
+
+    Histogram-peak anchors are placed first (spread farthest-first when there
+    are more than `n`), k-means++ seeds fill the remaining slots, and a few
+    Lloyd iterations refine the centers and give the component weights.
+    """
+    from sklearn.cluster import KMeans, kmeans_plusplus
+    seeds, _ = kmeans_plusplus(data, n_clusters=n, random_state=random_state)
+    centers = seeds
+    if anchors is not None and len(anchors):
+        chosen = [0]
+        distance = np.linalg.norm(anchors - anchors[0], axis=1)
+        while len(chosen) < min(n, len(anchors)):
+            chosen.append(int(distance.argmax()))
+            distance = np.minimum(distance, np.linalg.norm(anchors - anchors[chosen[-1]], axis=1))
+        centers = np.vstack([anchors[chosen], seeds[:n - len(chosen)]])
+
+    kmeans = KMeans(n_clusters=n, init=centers, n_init=1, max_iter=max_iter,
+                    random_state=random_state).fit(data)
+    weights = np.maximum(np.bincount(kmeans.labels_, minlength=n) / len(data), 1e-3)
+    return kmeans.cluster_centers_, weights / weights.sum()
+
+
+def _fit_candidate(data, n, n_init=10, random_state=42, covariance_type='full', init='peaks',
+                   anchors=None):
+    """Fits a single candidate GMM and returns it along with its BIC/AIC scores.
+
+    `init='peaks'` runs EM from the peak-anchored and from the plain k-means++
+    starting point of `initial_parameters` and keeps the better fit;
+    `init='kmeans'` keeps scikit-learn's `n_init` randomly seeded k-means restarts.
+    """
+    from sklearn.mixture import GaussianMixture
+    if init != 'peaks':
+        gmm = GaussianMixture(n_components=n, covariance_type=covariance_type, 
+                              random_state=random_state, reg_covar=1e-6, n_init=n_init)
+        gmm.fit(data)
+        return n, gmm, gmm.bic(data), gmm.aic(data)
+
+    best = None
+    for start_anchors in ([anchors, None] if anchors is not None and len(anchors) else [None]):
+        means, weights = initial_parameters(data, n, anchors=start_anchors, random_state=random_state)
+        gmm = GaussianMixture(n_components=n, covariance_type=covariance_type,
+                              random_state=random_state, reg_covar=1e-6,
+                              means_init=means, weights_init=weights)
+        gmm.fit(data)
+        bic = gmm.bic(data)
+        if best is None or bic < best[1]:
+            best = (gmm, bic)
+    gmm, bic = best
+    return n, gmm, bic, gmm.aic(data)
+
+
+def select_best_component(data, max_components=10, plot=True, public_dir=None,
+                          n_jobs=None, patience=3, n_init=10, covariance_type='full',
+                          random_state=42, verbose=True, init='peaks', anchors=None):
+    """Sweeps the number of GMM components and returns (best_n, fitted_gmm).
+
+    Candidates are fitted in waves of `n_jobs` on a process pool. The sweep stops
+    once BIC has not improved for `patience` consecutive component counts
+    (`patience=None` evaluates every count up to `max_components`). Results are
+    consumed in component order, so the selected model is the same as the serial
+    path regardless of `n_jobs`.
+    """
+    max_components = max(1, min(max_components, len(data)))
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, max_components)
+
     bic_scores = []
     aic_scores = []
-    for n in range(1, max_components + 1):
-        gmm = GaussianMixture(n_components=n, covariance_type='full', 
-                             random_state=42, reg_covar=1e-6, n_init=10)
-        gmm.fit(data)
-        bic_scores.append(gmm.bic(data))
-        aic_scores.append(gmm.aic(data))
+    best_n, best_gmm, best_bic = None, None, np.inf
+    since_best = 0
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+    try:
+        next_n = 1
+        stop = False
+        while next_n <= max_components and not stop:
+            wave = range(next_n, min(next_n + n_jobs, max_components + 1))
+            next_n = wave.stop
+            fit = partial(_fit_candidate, data, n_init=n_init, random_state=random_state,
+                          covariance_type=covariance_type, init=init, anchors=anchors)
+            results = executor.map(fit, wave) if executor is not None else map(fit, wave)
+
+            for n, gmm, bic, aic in results:
+                emit('candidate', n_components=n, covariance_type=covariance_type, bic=bic,
+                     aic=aic, n_iter=gmm.n_iter_, converged=gmm.converged_, rows=len(data))
+                bic_scores.append(bic)
+                aic_scores.append(aic)
+                if bic < best_bic:
+                    best_n, best_gmm, best_bic = n, gmm, bic
+                    since_best = 0
+                else:
+                    since_best += 1
+                if patience is not None and since_best >= patience:
+                    stop = True
+                    break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if verbose and len(bic_scores) < max_components:
+        print(f"BIC stopped improving after {best_n} components, "
+              f"evaluated {len(bic_scores)} of {max_components} candidates")
     # if plot and public_dir:
     #     plt.figure(figsize=(10, 6))
-    #     plt.plot(range(1, max_components + 1), bic_scores, label='BIC', marker = 'o')
-    #     plt.plot(range(1, max_components + 1), aic_scores, label='AIC', marker = 's')
+    #     plt.plot(range(1, len(bic_scores) + 1), bic_scores, label='BIC', marker = 'o')
+    #     plt.plot(range(1, len(aic_scores) + 1), aic_scores, label='AIC', marker = 's')
     #     plt.xlabel('Number of components', fontsize = 14)
     #     plt.ylabel('Score', fontsize = 14)
     #     plt.legend(fontsize=12)
@@ -85,152 +268,514 @@ def select_best_component(data, max_components=10, plot=True, public_dir=None):
     #     plt.grid(True, linestyle='--', alpha=0.6)
     #     plt.savefig(os.path.join(public_dir, 'bic_aic_plot.png'), dpi=300, bbox_inches='tight', pad_inches=0.2)
     #     plt.close()
-    return np.argmin(bic_scores) + 1
+    return best_n, best_gmm
 # ========================================================================
 
 # ================= GENERATE DISCRETE DATA ======================================
-def generate_synthetic_discrete(data, features, n_samples=1000, smoothing=0.01):
-    if len(features) == 0:
-        return pd.DataFrame(index=range(n_samples))
-    synthetic_discrete = pd.DataFrame(index=range(n_samples))
+def alias_table(probs):
+    """Walker/Vose alias table of `probs`, for drawing codes in constant time.
+
+    Code j is kept with probability `accept[j]` and otherwise replaced by `alias[j]`.
+    """
+    k = len(probs)
+    scaled = (np.asarray(probs, dtype=float) * (k / np.sum(probs))).tolist()
+    accept, alias = [1.0] * k, list(range(k))
+    small = [i for i, q in enumerate(scaled) if q < 1]
+    large = [i for i, q in enumerate(scaled) if q >= 1]
+    while small and large:
+        s, l = small.pop(), large[-1]
+        accept[s], alias[s] = scaled[s], l
+        scaled[l] -= 1 - scaled[s]
+        if scaled[l] < 1:
+            small.append(large.pop())
+    # Whatever is left holds (up to rounding) exactly one column's mass
+    return np.array(accept), np.array(alias, dtype=np.intp)
+
+
+def _discrete_table(counts, dtype, smoothing=0.01):
+    """Frequency table of one discrete column.
+
+    Samples are integer codes into `values`, drawn from an alias table.
+    Non-numeric columns keep their codes as a Categorical over the shared
+    `categories` dictionary, so labels are only materialized when the output
+    is written.
+    """
+    if counts.empty:
+        return None
+    val_counts = counts / counts.sum()
+    if smoothing > 0:
+        val_counts = (val_counts + smoothing) / (1 + smoothing * len(val_counts))
+    return {
+        'values': val_counts.index,
+        'probs': val_counts.values,
+        'alias': alias_table(val_counts.values),
+        'categories': pd.CategoricalDtype(val_counts.index) if dtype is None else None,
+        'dtype': dtype,
+        # Raw counts let the table be updated incrementally
+        'counts': counts,
+        'smoothing': smoothing,
+    }
+
+
+def fit_discrete_model(data, features, smoothing=0.01):
+    """Builds the (smoothed) frequency table for each discrete feature."""
+    tables = {}
     for col in features:
-        val_counts = data[col].value_counts(normalize=True)
-        if val_counts.empty:
+        dtype = data[col].dtype if pd.api.types.is_numeric_dtype(data[col]) else None
+        tables[col] = _discrete_table(data[col].value_counts(), dtype, smoothing=smoothing)
+    return tables
+
+
+def sample_discrete_codes(table, n_samples=1000):
+    """Draws `n_samples` integer codes into `table['values']`."""
+    accept, alias = table['alias']
+    codes = np.random.randint(0, len(accept), size=n_samples)
+    return np.where(np.random.random_sample(n_samples) < accept[codes], codes, alias[codes])
+
+
+def sample_discrete_model(tables, n_samples=1000):
+    """Samples every discrete column; non-numeric ones come back as Categorical columns."""
+    columns = {}
+    for col, table in tables.items():
+        if table is None:
             print(f"Warning: No values found for column {col}, using default value")
-            synthetic_discrete[col] = "Unknown"
+            columns[col] = np.full(n_samples, "Unknown", dtype=object)
             continue
-            
-        if smoothing > 0:
-            val_counts = (val_counts + smoothing) / (1 + smoothing * len(val_counts))
-        synthetic_discrete[col] = np.random.choice(
-            val_counts.index, 
-            size=n_samples, 
-            p=val_counts.values
-        )
-        if pd.api.types.is_numeric_dtype(data[col]):
-            synthetic_discrete[col] = synthetic_discrete[col].astype(data[col].dtype)
-    return synthetic_discrete
+
+        codes = sample_discrete_codes(table, n_samples)
+        if table['dtype'] is None:
+            columns[col] = pd.Categorical.from_codes(codes, dtype=table['categories'])
+        else:
+            columns[col] = table['values'].to_numpy()[codes].astype(table['dtype'])
+    return pd.DataFrame(columns, index=range(n_samples))
+
+
+def generate_synthetic_discrete(data, features, n_samples=1000, smoothing=0.01):
+    if len(features) == 0:
+        return pd.DataFrame(index=range(n_samples))
+    tables = fit_discrete_model(data, features, smoothing=smoothing)
+    return sample_discrete_model(tables, n_samples=n_samples)
+# ========================================================================
+
+# ================= PARALLEL MODEL FITTING ======================================
+def _fit_in_pool(fit, arg_list, n_jobs=None):
+    """Runs `fit(*args)` for every args tuple on a process pool and returns the results in order."""
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(arg_list))
+    if n_jobs <= 1:
+        return [fit(*args) for args in arg_list]
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = [executor.submit(fit, *args) for args in arg_list]
+        return [future.result() for future in futures]
+
+
+def allocate_samples(sizes, n_samples):
+    """Splits `n_samples` proportionally to `sizes`, handing out the rounding remainder
+    to the largest fractional shares so the counts always add up to `n_samples`."""
+    sizes = np.asarray(sizes, dtype=float)
+    exact = n_samples * sizes / sizes.sum()
+    counts = np.floor(exact).astype(int)
+    remainder = n_samples - counts.sum()
+    counts[np.argsort(counts - exact, kind='stable')[:remainder]] += 1
+    return counts
+# ========================================================================
+
+# ================= BLOCK-FACTORIZED GMM ======================================
+def group_correlated_features(correlation, threshold=0.3, max_block_size=16):
+    """Groups feature indices into blocks along their strongest absolute correlations.
+
+    Pairs are merged greedily from the most to the least correlated, as long as
+    |corr| >= `threshold` and the merged block stays within `max_block_size`.
+    """
+    strength = np.nan_to_num(np.abs(np.asarray(correlation, dtype=float)))
+    k = len(strength)
+    parent, size = list(range(k)), [1] * k
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows, cols = np.triu_indices(k, 1)
+    pair_strength = strength[rows, cols]
+    for idx in np.argsort(-pair_strength, kind='stable'):
+        if pair_strength[idx] < threshold:
+            break
+        a, b = find(rows[idx]), find(cols[idx])
+        if a != b and size[a] + size[b] <= max_block_size:
+            parent[b] = a
+            size[a] += size[b]
+
+    blocks = {}
+    for i in range(k):
+        blocks.setdefault(find(i), []).append(i)
+    return list(blocks.values())
+
+
+def _fit_block(block_data, max_components=10, patience=3, random_state=42, anchors=None,
+               covariance_types=('full', 'tied', 'diag')):
+    """Picks the component count and covariance type of one block's GMM by BIC."""
+    best = None
+    for covariance_type in covariance_types:
+        n, gmm = select_best_component(block_data, max_components=max_components, n_jobs=1,
+                                       patience=patience, covariance_type=covariance_type,
+                                       random_state=random_state, verbose=False, anchors=anchors)
+        bic = gmm.bic(block_data)
+        if best is None or bic < best[0]:
+            best = (bic, covariance_type, n, gmm)
+    return best[1:]
+
+
+def fit_block_model(scaled_data, correlation, max_components=10, patience=3, n_jobs=None,
+                    threshold=0.3, max_block_size=16, anchors=None):
+    """Fits an independent GMM per block of correlated features, blocks in parallel.
+
+    Memory and EM cost scale with the block sizes instead of the full width,
+    so tables with hundreds of continuous columns stay tractable.
+    """
+    blocks = group_correlated_features(correlation, threshold=threshold, max_block_size=max_block_size)
+    # Each block gets its own seed so blocks never share random draws
+    args = [(scaled_data[:, cols], max_components, patience, 42 + i,
+             anchors[:, cols] if anchors is not None else None)
+            for i, cols in enumerate(blocks)]
+    results = _fit_in_pool(_fit_block, args, n_jobs=n_jobs)
+
+    summary = {}
+    for covariance_type, n, _ in results:
+        summary[covariance_type] = summary.get(covariance_type, 0) + 1
+    print(f"Fitted {len(blocks)} feature blocks (largest {max(map(len, blocks))} columns), "
+          f"covariance types: {summary}")
+    return [(cols, gmm) for cols, (_, _, gmm) in zip(blocks, results)]
+
+
+def sample_block_model(blocks, n_samples, n_features):
+    synthetic_samples = np.empty((n_samples, n_features))
+    for cols, gmm in blocks:
+        # gmm.sample() returns rows ordered by component; shuffle before joining blocks
+        block_samples = gmm.sample(n_samples=n_samples)[0]
+        synthetic_samples[:, cols] = block_samples[np.random.permutation(n_samples)]
+    return synthetic_samples
+# ========================================================================
+
+# ================= CLUSTER GMM ======================================
+MINIBATCH_ROWS = 50_000
+
+
+def cluster_rows(scaled_data, n_clusters, random_state=42):
+    """Assigns every row to a k-means cluster; large inputs use mini-batch k-means."""
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    if len(scaled_data) > MINIBATCH_ROWS:
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state,
+                                 batch_size=4096, n_init=3)
+    else:
+        kmeans = KMeans(n_clusters=n_clusters, random_state=random_state)
+    return kmeans.fit_predict(scaled_data)
+
+
+def _fit_cluster(cluster_data, n_components, random_state=42):
+    return _fit_candidate(cluster_data, n_components, random_state=random_state)[1]
+
+
+def fit_cluster_model(scaled_data, n_clusters, n_jobs=None):
+    """Clusters the rows and fits one small GMM per cluster, clusters in parallel.
+
+    Returns a list of (cluster_size, gmm); clusters with a single row are dropped.
+    """
+    labels = cluster_rows(scaled_data, n_clusters)
+    sizes = np.bincount(labels, minlength=n_clusters)
+
+    args = []
+    for cluster_id in np.flatnonzero(sizes > 1):
+        n_components = min(3, max(1, sizes[cluster_id] // 30))
+        args.append((scaled_data[labels == cluster_id], n_components))
+    gmms = _fit_in_pool(_fit_cluster, args, n_jobs=n_jobs)
+
+    print(f"Fitted {len(gmms)} cluster models (sizes {sorted(sizes.tolist(), reverse=True)})")
+    return [(len(cluster_data), gmm) for (cluster_data, _), gmm in zip(args, gmms)]
+# ========================================================================
+
+# ================= SUBSAMPLE FITTING ======================================
+def stratified_order(scaled_data, strata_columns=3, bins=4, seed=0):
+    """Returns row indices in an order whose every prefix is a stratified sample.
+
+    Rows are bucketed by quantile bins of the highest-variance columns and each
+    row is ranked by its random position within its bucket, relative to the
+    bucket size. The first m indices therefore hold every bucket in proportion,
+    and a smaller prefix is always contained in a larger one.
+    """
+    rng = np.random.default_rng(seed)
+    n_rows = len(scaled_data)
+    strata = np.zeros(n_rows, dtype=np.int64)
+    for col in np.argsort(scaled_data.var(axis=0))[::-1][:strata_columns]:
+        edges = np.quantile(scaled_data[:, col], np.linspace(0, 1, bins + 1)[1:-1])
+        strata = strata * bins + np.searchsorted(edges, scaled_data[:, col])
+
+    order = np.lexsort((rng.random(n_rows), strata))
+    sorted_strata = strata[order]
+    starts = np.flatnonzero(np.r_[True, sorted_strata[1:] != sorted_strata[:-1]])
+    sizes = np.diff(np.r_[starts, n_rows])
+    position = np.arange(n_rows) - np.repeat(starts, sizes)
+    rank = (position + rng.random(n_rows)) / np.repeat(sizes, sizes)
+    return order[np.argsort(rank, kind='stable')]
+
+
+def holdout_size(n_rows, holdout_rows=20_000):
+    # Small inputs hold out a fifth of their rows so the fitting pool never runs dry
+    return min(holdout_rows, n_rows // 5)
+
+
+def fit_on_subsample(scaled_data, fit, start_rows=50_000, holdout_rows=20_000, growth=2,
+                     tolerance=0.01, seed=0):
+    """Fits on growing stratified subsamples until the held-out log-likelihood stabilizes.
+
+    `fit(rows)` returns a continuous model part (see `_fit_scaled_model`). The
+    sample doubles (by `growth`) until the mean held-out log-likelihood changes
+    by less than `tolerance` nats per row, or all rows are used.
+    """
+    holdout_rows = holdout_size(len(scaled_data), holdout_rows)
+    if holdout_rows == 0:
+        return fit(scaled_data)
+    order = stratified_order(scaled_data, seed=seed)
+    holdout = scaled_data[order[-holdout_rows:]]
+    pool = order[:-holdout_rows]
+
+    n_rows, previous, fitted = min(start_rows, len(pool)), None, None
+    while True:
+        fitted = fit(scaled_data[np.sort(pool[:n_rows])])
+        score = continuous_log_likelihood(fitted, holdout)
+        print(f"Fitted on {n_rows} of {len(scaled_data)} rows, held-out log-likelihood {score:.4f}")
+        emit('subsample_fit', rows=n_rows, total_rows=len(scaled_data), heldout_log_likelihood=score)
+        if n_rows >= len(pool) or (previous is not None and abs(score - previous) < tolerance):
+            return fitted
+        previous = score
+        n_rows = min(int(n_rows * growth), len(pool))
+
+
+def continuous_log_likelihood(model, scaled_data):
+    """Mean per-row log-likelihood of already-scaled rows under a fitted continuous model."""
+    if model['kind'] == 'gmm':
+        return model['gmm'].score(scaled_data)
+    if model['kind'] == 'block_gmm':
+        # Blocks are independent, so their log-likelihoods add up
+        return sum(gmm.score(scaled_data[:, cols]) for cols, gmm in model['blocks'])
+    if model['kind'] == 'cluster_gmm':
+        from scipy.special import logsumexp
+        sizes = np.array([size for size, _ in model['clusters']], dtype=float)
+        per_cluster = np.column_stack([gmm.score_samples(scaled_data) for _, gmm in model['clusters']])
+        return float(logsumexp(per_cluster + np.log(sizes / sizes.sum()), axis=1).mean())
+    raise ValueError(f"Unknown continuous model kind: {model['kind']}")
 # ========================================================================
 
 # ================= GENERATE CONTINUOS DATA ======================================
-def generate_synthetic_continuous(data, features, n_samples=1000, model_type='gmm'):
+def _fit_scaled_model(scaled_data, model_type='gmm', max_components=10, n_jobs=None,
+                      patience=3, correlation=None, max_block_size=16, anchors=None):
+    n_clusters = min(5, len(scaled_data) // 100)
+    if model_type == 'cluster_gmm' and n_clusters < 2:
+        print("Too few rows to cluster, falling back to a single GMM")
+        model_type = 'gmm'
+
+    if model_type == 'gmm':
+        best_n, gmm = select_best_component(scaled_data, max_components=max_components,
+                                            n_jobs=n_jobs, patience=patience, anchors=anchors)
+        print(f"Selected {best_n} components for GMM")
+        return {'kind': 'gmm', 'gmm': gmm}
+
+    if model_type == 'block_gmm':
+        if correlation is None:
+            correlation = np.corrcoef(scaled_data, rowvar=False)
+        blocks = fit_block_model(scaled_data, correlation, max_components=max_components,
+                                 patience=patience, n_jobs=n_jobs, max_block_size=max_block_size,
+                                 anchors=anchors)
+        return {'kind': 'block_gmm', 'blocks': blocks}
+
+    if model_type == 'cluster_gmm':
+        return {'kind': 'cluster_gmm', 'clusters': fit_cluster_model(scaled_data, n_clusters, n_jobs=n_jobs)}
+
+    raise ValueError(f"Unknown model type: {model_type}")
+
+
+def fit_continuous_model(data, features, model_type='gmm', max_components=10,
+                         n_jobs=None, patience=3, profile=None, max_block_size=16,
+                         fit_rows=50_000):
+    """Fits the scaler and mixture model(s) for the continuous features.
+
+    The returned dict holds everything `sample_continuous_model` needs, so it
+    can be persisted and sampled again without touching the original data.
+    Inputs much larger than `fit_rows` are fitted on growing stratified
+    subsamples (see `fit_on_subsample`); the scaler always sees every row.
+    `fit_rows=None` fits on all rows.
+    """
+    # scikit-learn is imported lazily so sample-only and plot-only runs start fast
+    from sklearn.preprocessing import MinMaxScaler
+
+    model = {'kind': 'empty', 'features': list(features)}
     if len(features) == 0:
-        return pd.DataFrame(index=range(n_samples))
+        return model
 
     # Drop rows with NaN values before scaling
     clean_data = data[features].dropna()
 
     if clean_data.empty:
         print(f"Warning: No valid data available for continuous features: {features}")
-        return pd.DataFrame(index=range(n_samples), columns=features)
+        return model
 
     scaler = MinMaxScaler()
     scaled_data = scaler.fit_transform(clean_data)
+    model['scaler'] = scaler
 
-    multimodal_features = {}
-    for feature in features:
-        is_multimodal, n_modes = detect_modality(clean_data, feature)
-        if is_multimodal:
-            multimodal_features[feature] = n_modes
-
+    # Histogram peaks of multimodal features seed EM instead of random restarts
+    with stage('detect_modality', columns=len(features)):
+        peaks = detect_modalities(clean_data, features, profile=profile)
+    multimodal_features = {feature: len(centers) for feature, centers in peaks.items() if len(centers)}
     if multimodal_features:
         print(f"Detected multimodal features: {multimodal_features}")
+    scaled_peaks = {
+        i: (peaks[feature] - scaler.data_min_[i]) * scaler.scale_[i]
+        for i, feature in enumerate(features) if len(peaks[feature])
+    }
+    anchors = peak_anchors(scaled_data, scaled_peaks)
 
-    if model_type == 'gmm':
-        best_n = select_best_component(scaled_data)
-        print(f"Selected {best_n} components for GMM")
+    correlation = None
+    if model_type == 'block_gmm' and profile is not None:
+        correlation = profile_correlation(profile, clean_data)
+    fit = partial(_fit_scaled_model, model_type=model_type, max_components=max_components,
+                  n_jobs=n_jobs, patience=patience, correlation=correlation,
+                  max_block_size=max_block_size, anchors=anchors)
 
-        gmm = GaussianMixture(n_components=best_n, random_state=42, 
-                              covariance_type='full', reg_covar=1e-6, n_init=10)
-        gmm.fit(scaled_data)
-        synthetic_samples = gmm.sample(n_samples=n_samples)[0]
-
-    elif model_type == 'cluster_gmm':
-        best_n = select_best_component(scaled_data)
-        n_clusters = min(5, len(clean_data) // 100)
-
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = kmeans.fit_predict(scaled_data)
-
-        synthetic_clusters = []
-        for cluster_id in range(n_clusters):
-            cluster_data = scaled_data[clusters == cluster_id]
-            cluster_size = len(cluster_data)
-
-            if cluster_size > 0:
-                cluster_samples = int(n_samples * (cluster_size / len(scaled_data)))
-                if cluster_samples > 0 and cluster_size > 1:
-                    n_components = min(3, max(1, cluster_size // 30))
-                    gmm = GaussianMixture(n_components=n_components, random_state=42,
-                                          covariance_type='full', reg_covar=1e-6, n_init=10)
-                    gmm.fit(cluster_data)
-                    cluster_synthetic = gmm.sample(n_samples=cluster_samples)[0]
-                    synthetic_clusters.append(cluster_synthetic)
-
-        if synthetic_clusters:
-            synthetic_samples = np.vstack(synthetic_clusters)
+    with stage('fit_mixture', model_type=model_type, rows=len(scaled_data), columns=len(features)):
+        # Only worth it when the input is several times the starting sample
+        if (fit_rows and len(scaled_data) > 4 * fit_rows
+                and len(scaled_data) - holdout_size(len(scaled_data)) > fit_rows):
+            model.update(fit_on_subsample(scaled_data, fit, start_rows=fit_rows))
         else:
-            gmm = GaussianMixture(n_components=min(3, len(scaled_data) // 100),
-                                  random_state=42, covariance_type='full',
-                                  reg_covar=1e-6, n_init=10)
-            gmm.fit(scaled_data)
-            synthetic_samples = gmm.sample(n_samples=n_samples)[0]
-
-        if len(synthetic_samples) < n_samples:
-            remaining = n_samples - len(synthetic_samples)
-            gmm = GaussianMixture(n_components=best_n, random_state=43,
-                                  covariance_type='full', reg_covar=1e-6, n_init=10)
-            gmm.fit(scaled_data)
-            extra_samples = gmm.sample(n_samples=remaining)[0]
-            synthetic_samples = np.vstack([synthetic_samples, extra_samples])
+            model.update(fit(scaled_data))
+
+    # Reference point for the drift check of incremental updates
+    reference = scaled_data[stratified_order(scaled_data)[:50_000]] if len(scaled_data) > 50_000 else scaled_data
+    model.update(n_rows=len(scaled_data), log_likelihood=continuous_log_likelihood(model, reference))
+    return model
+
+
+def sample_continuous_model(model, n_samples=1000):
+    features = model['features']
+    if model['kind'] == 'empty':
+        if len(features) == 0:
+            return pd.DataFrame(index=range(n_samples))
+        return pd.DataFrame(index=range(n_samples), columns=features)
+
+    if model['kind'] == 'gmm':
+        synthetic_samples = model['gmm'].sample(n_samples=n_samples)[0]
+
+    elif model['kind'] == 'block_gmm':
+        synthetic_samples = sample_block_model(model['blocks'], n_samples, len(features))
+
+    elif model['kind'] == 'cluster_gmm':
+        # Every sample goes to a cluster model, so no global top-up GMM is needed
+        counts = allocate_samples([size for size, _ in model['clusters']], n_samples)
+        synthetic_samples = np.vstack([
+            gmm.sample(n_samples=count)[0]
+            for (_, gmm), count in zip(model['clusters'], counts) if count > 0
+        ])
+
+    if model['kind'] in ('gmm', 'cluster_gmm'):
+        # gmm.sample() (and the cluster stack) returns rows grouped by component
+        synthetic_samples = synthetic_samples[np.random.permutation(n_samples)]
 
     synthetic_continuous = pd.DataFrame(
-        scaler.inverse_transform(synthetic_samples),
+        model['scaler'].inverse_transform(synthetic_samples),
         columns=features
     )
     return synthetic_continuous
+
+
+def generate_synthetic_continuous(data, features, n_samples=1000, model_type='gmm',
+                                  max_components=10, n_jobs=None, patience=3, max_block_size=16,
+                                  fit_rows=50_000):
+    model = fit_continuous_model(data, features, model_type=model_type,
+                                 max_components=max_components, n_jobs=n_jobs,
+                                 patience=patience, max_block_size=max_block_size,
+                                 fit_rows=fit_rows)
+    return sample_continuous_model(model, n_samples=n_samples)
 # ========================================================================
 
 # ========================== PRESERVE FEATURE CORRELATIONS ==============================================
-def preserve_feature_correlations(cont_df, disc_df, original_data, strength=0.5):
+def compute_conditional_stats(original_data, disc_cols, cont_cols):
+    """Per-value conditional count/mean/std of the continuous columns for each numeric discrete column.
+
+    Each entry holds the discrete values (in order of appearance) and
+    (n_values x n_continuous) arrays, computed with one grouped aggregation
+    per discrete column.
+    """
+    cont_cols = list(cont_cols)
+    conditional_stats = {}
+    for disc_col in disc_cols:
+        if not pd.api.types.is_numeric_dtype(original_data[disc_col]):
+            continue
+
+        grouped = original_data.groupby(disc_col, sort=False)[cont_cols]
+        conditional_stats[disc_col] = {
+            'values': grouped.size().index.to_numpy(),
+            'columns': cont_cols,
+            'count': grouped.count().to_numpy(dtype=float),
+            'mean': grouped.mean().to_numpy(dtype=float),
+            'std': grouped.std().to_numpy(dtype=float),
+        }
+    return conditional_stats
+
+
+def preserve_feature_correlations(cont_df, disc_df, original_data, strength=0.5,
+                                  conditional_stats=None):
+    """Pulls each continuous column towards its conditional mean/std given every numeric discrete column.
+
+    Discrete columns are processed in order, since each one adjusts the values
+    seen by the next; within a column all values and continuous features are
+    blended in a single vectorized pass.
+    """
+    if conditional_stats is None:
+        conditional_stats = compute_conditional_stats(original_data, disc_df.columns, cont_df.columns)
+
     result_df = cont_df.copy()
     
     for col in disc_df.columns:
         result_df[col] = disc_df[col].values
     
     for disc_col in disc_df.columns:
-        if not pd.api.types.is_numeric_dtype(original_data[disc_col]):
+        if disc_col not in conditional_stats:
             continue
-            
-        unique_values = original_data[disc_col].unique()
+        stats = conditional_stats[disc_col]
+        cont_cols = stats['columns']
         
-        for value in unique_values:
-            synth_mask = result_df[disc_col] == value
-            orig_mask = original_data[disc_col] == value
-            
-            if orig_mask.sum() == 0 or synth_mask.sum() == 0:
-                continue
-                
-            for cont_col in cont_df.columns:
-                orig_cond_mean = original_data.loc[orig_mask, cont_col].mean()
-                orig_cond_std = original_data.loc[orig_mask, cont_col].std()
-                
-                if np.isnan(orig_cond_std) or orig_cond_std == 0:
-                    continue
-                
-                synth_mean = result_df.loc[synth_mask, cont_col].mean()
-                synth_std = result_df.loc[synth_mask, cont_col].std()
-                
-                if np.isnan(synth_std) or synth_std == 0:
-                    continue
-                
-                std_values = (result_df.loc[synth_mask, cont_col] - synth_mean) / synth_std
-                adjusted_values = (std_values * orig_cond_std) + orig_cond_mean
-                
-                result_df.loc[synth_mask, cont_col] = (
-                    (1 - strength) * result_df.loc[synth_mask, cont_col] + 
-                    strength * adjusted_values
-                )
+        codes = pd.Index(stats['values']).get_indexer(result_df[disc_col].values)
+        matched = codes >= 0
+        if not matched.any():
+            continue
+        
+        values = result_df[cont_cols].to_numpy(dtype=float, copy=True)
+        grouped = pd.DataFrame(values[matched]).groupby(codes[matched])
+        group_mean, group_std = grouped.mean(), grouped.std()
+        synth_mean = np.full(stats['mean'].shape, np.nan)
+        synth_std = np.full(stats['std'].shape, np.nan)
+        synth_mean[group_mean.index] = group_mean.to_numpy()
+        synth_std[group_std.index] = group_std.to_numpy()
+        
+        orig_mean, orig_std = stats['mean'], stats['std']
+        valid = ~np.isnan(orig_std) & (orig_std != 0) & ~np.isnan(synth_std) & (synth_std != 0)
+        
+        rows = np.flatnonzero(matched)
+        row_codes = codes[rows]
+        row_valid = valid[row_codes]
+        if not row_valid.any():
+            continue
+        
+        current = values[rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std_values = (current - synth_mean[row_codes]) / synth_std[row_codes]
+            adjusted_values = (std_values * orig_std[row_codes]) + orig_mean[row_codes]
+            blended = (1 - strength) * current + strength * adjusted_values
+        values[rows] = np.where(row_valid, blended, current)
+        result_df[cont_cols] = values
     
     return result_df
 # ===================================================================================
@@ -259,212 +804,1050 @@ def enforce_constraints(df, constraints=None):
 # =====================================================================================
 
 # ========================== EVALUATE SYNTHETIC DATA ==============================================
-def evaluate_synthetic_data(real_df, synthetic_df, discrete_features=None, public_dir=None):
-    features = real_df.columns
-    num_features = len(features)
-    ncols = 3
-    nrows = (num_features + ncols - 1) // ncols
-    
-    plt.figure(figsize=(ncols * 8, nrows * 6))
-    for idx, feature in enumerate(features):
-        plt.subplot(nrows, ncols, idx + 1)
-        
-        is_discrete = (discrete_features and feature in discrete_features) or \
-                      not pd.api.types.is_numeric_dtype(real_df[feature])
-        
-        if is_discrete:
-            real_counts = real_df[feature].value_counts(normalize=True).nlargest(10)
-            synth_counts = synthetic_df[feature].value_counts(normalize=True)
-            
-            top_values = list(real_counts.index)
-            x = np.arange(len(top_values))
-            width = 0.35
-            
-            plt.bar(x - width / 2, 
-                    [real_counts.get(idx, 0) for idx in top_values], 
-                    width, label='Original', alpha=0.7)
-            plt.bar(x + width / 2, 
-                    [synth_counts.get(idx, 0) for idx in top_values], 
-                    width, label='Synthetic', alpha=0.7)
-            
-            plt.xticks(x, top_values, rotation=45, ha='right')
-            plt.title(f'Top Values for {feature}', fontsize=14)
-        else:
-            try:
-                sns.kdeplot(data=real_df, x=feature, label='Original', 
-                            color='blue', fill=True, alpha=0.5)
-                sns.kdeplot(data=synthetic_df, x=feature, label='Synthetic', 
-                            color='orange', fill=True, alpha=0.5)
-                plt.title(f'KDE of {feature}', fontsize=14)
-            except (TypeError, ValueError) as e:
-                plt.text(0.5, 0.5, f"Cannot plot {feature}: {str(e)}", 
-                         ha='center', va='center', transform=plt.gca().transAxes)
-                plt.axis('off')
-        
-        plt.legend(fontsize=12)
-        plt.grid(False)
-    
-    plt.tight_layout()
-    if public_dir:
-        plt.savefig(os.path.join(public_dir, 'distributions.png'), dpi=300, bbox_inches='tight', pad_inches=0.2)
-    plt.close()
-    
-    numeric_cols = [col for col in real_df.columns if pd.api.types.is_numeric_dtype(real_df[col])]
-    corr_metrics = None
-    
-    if numeric_cols:
-        real_corr = real_df[numeric_cols].corr()
-        synth_corr = synthetic_df[numeric_cols].corr()
-        corr_diff = np.abs(real_corr - synth_corr)
-        max_diff = corr_diff.max().max()
-        avg_diff = corr_diff.mean().mean()
-        corr_metrics = {'max_diff': max_diff, 'avg_diff': avg_diff}
-        
-        if len(numeric_cols) < 7:
-            plt.figure(figsize=(18, 6))
-            plt.suptitle(f"Max Difference: {max_diff:.4f}, Average Difference: {avg_diff:.4f}", fontsize=16, y=1.02)
-            
-            plt.subplot(131)
-            sns.heatmap(real_corr, annot=False, cmap='coolwarm', cbar=True)
-            plt.title('Original Data Correlation', fontsize=14)
-            
-            plt.subplot(132)
-            sns.heatmap(synth_corr, annot=False, cmap='coolwarm', cbar=True)
-            plt.title('Synthetic Data Correlation', fontsize=14)
-            
-            plt.subplot(133)
-            sns.heatmap(corr_diff, annot=False, cmap='viridis', cbar=True)
-            plt.title('Absolute Correlation Difference', fontsize=14)
-            
-            plt.tight_layout()
-            if public_dir:
-                plt.savefig(os.path.join(public_dir, 'correlation_matrix.png'), dpi=300, bbox_inches='tight', pad_inches=0.2)
-            plt.close()
-            
-            print(f"Max correlation difference: {corr_diff.max().max():.4f}")
-            print(f"Average correlation difference: {corr_diff.mean().mean():.4f}")
-        else:
-            print(f"Skipping correlation plot for {len(numeric_cols)} columns (too many)")
+def evaluate_synthetic_data(real_df, synthetic_df, discrete_features=None, public_dir=None,
+                            plots=True, max_rows=100_000):
+    """Returns an `EvaluationMetrics` for the synthetic table and optionally renders the plots.
+
+    Metrics are computed on at most `max_rows` (stratified) rows per table;
+    plots are only drawn when `plots` is set and there is a `public_dir` to save them in.
+    """
+    metrics = evaluate_metrics(real_df, synthetic_df, discrete_features, max_rows=max_rows)
     
-    ks_results = {}
-    for col in real_df.columns:
-        if col not in discrete_features and pd.api.types.is_numeric_dtype(real_df[col]):
-            statistic, p_value = ks_2samp(real_df[col], synthetic_df[col])
-            ks_results[col] = {"KS statistic": statistic, "p-value": p_value}
+    if plots and public_dir:
+        render_evaluation_plots(real_df, synthetic_df, discrete_features, public_dir)
     
-    if corr_metrics:
+    if metrics.correlation:
         print("\nCorrelation Differences:")
-        print(f"Maximum: {corr_metrics['max_diff']:.4f}")
-        print(f"Average: {corr_metrics['avg_diff']:.4f}")
+        print(f"Maximum: {metrics.correlation['max_diff']:.4f}")
+        print(f"Average: {metrics.correlation['avg_diff']:.4f}")
     
-    return ks_results
-
+    return metrics
 # ==========================================================================
 
 
 # ========================== GENERATE SYNTHETIC DATA ==============================================
-def generate_synthetic_data(data, n_samples=1000, preserve_correlations=True, 
-                          discrete_threshold=0.05, model_type='gmm', public_dir=None):
-    continuous_features, discrete_features = identify_feature_types(
-        data, discrete_threshold=discrete_threshold
-    )
+def fit_synthetic_model(data, preserve_correlations=True, discrete_threshold=0.05,
+                        model_type='gmm', max_components=10, n_jobs=None, patience=3,
+                        max_block_size=16, fit_rows=50_000):
+    """Fits every piece of state needed to sample synthetic rows like `data`.
+
+    The result is a plain dict (scaler + mixture model, discrete frequency
+    tables, conditional statistics, constraints and rounding metadata) that can
+    be persisted with `model_store` and passed to `sample_synthetic_model`.
+    """
+    with stage('profile', rows=len(data), columns=data.shape[1]):
+        profile = profile_dataset(data)
+    with stage('identify_feature_types', columns=data.shape[1]):
+        continuous_features, discrete_features = identify_feature_types(
+            data, discrete_threshold=discrete_threshold, profile=profile
+        )
     
     continuous_features = [col for col in continuous_features if pd.api.types.is_numeric_dtype(data[col])]
     remaining_columns = set(data.columns) - set(continuous_features)
     discrete_features = list(remaining_columns)
     
-    synthetic_continuous = generate_synthetic_continuous(
-        data, continuous_features, n_samples=n_samples, model_type=model_type
-    )
+    with stage('fit_continuous', rows=len(data), columns=len(continuous_features)):
+        continuous_model = fit_continuous_model(
+            data, continuous_features, model_type=model_type,
+            max_components=max_components, n_jobs=n_jobs, patience=patience, profile=profile,
+            max_block_size=max_block_size, fit_rows=fit_rows
+        )
+    with stage('fit_discrete', rows=len(data), columns=len(discrete_features)):
+        discrete_tables = fit_discrete_model(data, discrete_features)
     
-    synthetic_discrete = generate_synthetic_discrete(
-        data, discrete_features, n_samples=n_samples
-    )
+    preserve_correlations = bool(preserve_correlations and continuous_features and discrete_features)
+    with stage('conditional_stats', rows=len(data)):
+        conditional_stats = (
+            compute_conditional_stats(data, discrete_features, continuous_features)
+            if preserve_correlations else None
+        )
     
-    if preserve_correlations and continuous_features and discrete_features:
+    original_constraints = {
+        col: (column.min, column.max)
+        for col, column in profile.columns.items()
+        if column.is_numeric
+    }
+    with stage('rounding_metadata', columns=data.shape[1]):
+        rounding = compute_rounding_metadata(data, profile=profile)
+    
+    return {
+        'continuous_features': continuous_features,
+        'discrete_features': discrete_features,
+        'continuous_model': continuous_model,
+        'discrete_tables': discrete_tables,
+        'preserve_correlations': preserve_correlations,
+        'conditional_stats': conditional_stats,
+        'constraints': original_constraints,
+        'rounding': rounding,
+        'dtypes': {col: column.dtype for col, column in profile.columns.items()},
+        'n_rows': len(data),
+    }
+
+
+def sample_synthetic_model(model, n_samples=1000, conditions=None):
+    """Draws `n_samples` rows from a model built by `fit_synthetic_model`.
+
+    `conditions` ({column: value, list of values or (low, high)}, see
+    `split_conditions`) samples a segment of the data directly instead of
+    filtering unconditional rows.
+    """
+    discrete_tables, preserve_correlations = model['discrete_tables'], model['preserve_correlations']
+    if conditions:
+        discrete_tables, equal, ranges = split_conditions(model, conditions)
+        synthetic_continuous = sample_conditional_continuous(model['continuous_model'], n_samples,
+                                                             equal=equal, ranges=ranges)
+        # The conditional stats describe the whole table; blending towards them would
+        # pull the conditioned rows back out of their segment
+        if equal or ranges:
+            preserve_correlations = False
+    else:
+        synthetic_continuous = sample_continuous_model(model['continuous_model'], n_samples=n_samples)
+    
+    if model['discrete_features']:
+        synthetic_discrete = sample_discrete_model(discrete_tables, n_samples=n_samples)
+    else:
+        synthetic_discrete = pd.DataFrame(index=range(n_samples))
+    
+    if preserve_correlations:
         synthetic_df = preserve_feature_correlations(
-            synthetic_continuous, synthetic_discrete, data
+            synthetic_continuous, synthetic_discrete, None,
+            conditional_stats=model['conditional_stats']
         )
     else:
         synthetic_df = pd.concat([synthetic_continuous, synthetic_discrete], axis=1)
     
-    original_constraints = {
-        col: (data[col].min(), data[col].max())
-        for col in data.columns
-        if pd.api.types.is_numeric_dtype(data[col])
-    }
+    return enforce_constraints(synthetic_df, constraints=model['constraints'])
+
+
+def generate_synthetic_data(data, n_samples=1000, preserve_correlations=True, 
+                          discrete_threshold=0.05, model_type='gmm', public_dir=None,
+                          max_components=10, n_jobs=None, patience=3, model=None,
+                          plots=True, eval_rows=100_000, conditions=None):
+    if model is None:
+        model = fit_synthetic_model(
+            data, preserve_correlations=preserve_correlations,
+            discrete_threshold=discrete_threshold, model_type=model_type,
+            max_components=max_components, n_jobs=n_jobs, patience=patience
+        )
     
-    synthetic_df = enforce_constraints(synthetic_df, constraints=original_constraints)
+    with stage('sample', rows=n_samples):
+        synthetic_df = sample_synthetic_model(model, n_samples=n_samples, conditions=conditions)
     
-    ks_results = evaluate_synthetic_data(data, synthetic_df, discrete_features, public_dir)
+    with stage('evaluate', rows=n_samples, plots=bool(plots and public_dir)):
+        quality_metrics = evaluate_synthetic_data(data, synthetic_df, model['discrete_features'], public_dir,
+                                                  plots=plots, max_rows=eval_rows)
     
-    return synthetic_df, ks_results
+    return synthetic_df, quality_metrics
 # ========================================================================
 
-# ============================= DETECTING DECIMAL PLACES OF COLUMNS =======================
-def detect_decimal_places(series):
-    """Returns the max number of decimal places found in a column."""
-    decimals = series.astype(str).str.split('.').str[-1]  
-    decimals = decimals[decimals.str.isnumeric()]
-    return decimals.str.len().max() or 0  
+# ============================= INCREMENTAL UPDATES =======================
+def rows_digest(data):
+    """Order-sensitive hash of a table's column names and row contents.
+
+    Stored with a fitted model so an update can check that the fitted rows
+    are still the first rows of the input, whatever its file format.
+    """
+    digest = hashlib.sha256(repr(list(data.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _merge_moments(count_a, mean_a, std_a, count_b, mean_b, std_b):
+    """Combines per-group count/mean/std (ddof=1) of two row sets (Chan et al.)."""
+    count = count_a + count_b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Empty groups have NaN moments; they must not poison the other side
+        mean_a, mean_b = np.where(count_a > 0, mean_a, 0.0), np.where(count_b > 0, mean_b, 0.0)
+        m2_a = np.where(count_a > 1, std_a ** 2 * (count_a - 1), 0.0)
+        m2_b = np.where(count_b > 1, std_b ** 2 * (count_b - 1), 0.0)
+        delta = mean_b - mean_a
+        mean = np.where(count > 0, mean_a + delta * count_b / count, np.nan)
+        m2 = m2_a + m2_b + delta ** 2 * count_a * count_b / count
+        std = np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)
+    return count, mean, std
+
+
+def update_conditional_stats(conditional_stats, new_rows):
+    """Folds `new_rows` into the per-value statistics of `compute_conditional_stats`."""
+    updated = {}
+    for disc_col, stats in conditional_stats.items():
+        batch = compute_conditional_stats(new_rows, [disc_col], stats['columns']).get(disc_col)
+        if batch is None:
+            updated[disc_col] = stats
+            continue
+
+        # Values first seen in this batch are appended after the known ones
+        known = pd.Index(stats['values'])
+        new_values = batch['values'][known.get_indexer(batch['values']) < 0]
+        values = np.concatenate([stats['values'], new_values]) if len(new_values) else stats['values']
+        rows = pd.Index(values).get_indexer(batch['values'])
+
+        def expand(array, fill):
+            out = np.full((len(values), array.shape[1]), fill)
+            out[:len(array)] = array
+            return out
+
+        count_b = np.zeros((len(values), len(stats['columns'])))
+        mean_b, std_b = np.full(count_b.shape, np.nan), np.full(count_b.shape, np.nan)
+        count_b[rows], mean_b[rows], std_b[rows] = batch['count'], batch['mean'], batch['std']
+        count, mean, std = _merge_moments(
+            expand(stats['count'], 0.0), expand(stats['mean'], np.nan), expand(stats['std'], np.nan),
+            count_b, mean_b, std_b
+        )
+        updated[disc_col] = dict(stats, values=values, count=count, mean=mean, std=std)
+    return updated
+
+
+def update_discrete_model(tables, new_rows):
+    """Adds the value counts of `new_rows` to every discrete frequency table."""
+    updated = {}
+    for col, table in tables.items():
+        batch_counts = new_rows[col].value_counts()
+        if table is None:
+            dtype = new_rows[col].dtype if pd.api.types.is_numeric_dtype(new_rows[col]) else None
+            updated[col] = _discrete_table(batch_counts, dtype)
+            continue
+        counts = pd.concat([table['counts'], batch_counts]).groupby(level=0, sort=False).sum()
+        updated[col] = _discrete_table(counts, table['dtype'], smoothing=table['smoothing'])
+    return updated
+
+
+def _full_covariances(gmm):
+    n_components, n_features = gmm.means_.shape
+    if gmm.covariance_type == 'full':
+        return gmm.covariances_.copy()
+    if gmm.covariance_type == 'tied':
+        return np.repeat(gmm.covariances_[None], n_components, axis=0)
+    if gmm.covariance_type == 'diag':
+        return np.stack([np.diag(cov) for cov in gmm.covariances_])
+    return np.stack([np.eye(n_features) * var for var in gmm.covariances_])
+
+
+def _set_gmm_parameters(gmm, weights, means, covariances):
+    """Stores parameters given with full covariances in the mixture's own covariance type."""
+    from sklearn.mixture._gaussian_mixture import _compute_precision_cholesky
+    if gmm.covariance_type == 'tied':
+        covariances = np.tensordot(weights, covariances, axes=1)
+    elif gmm.covariance_type == 'diag':
+        covariances = np.diagonal(covariances, axis1=1, axis2=2).copy()
+    elif gmm.covariance_type == 'spherical':
+        covariances = np.diagonal(covariances, axis1=1, axis2=2).mean(axis=1)
+
+    gmm.weights_, gmm.means_, gmm.covariances_ = weights, means, covariances
+    gmm.precisions_cholesky_ = _compute_precision_cholesky(covariances, gmm.covariance_type)
+    if gmm.covariance_type == 'full':
+        gmm.precisions_ = np.einsum('kij,klj->kil', gmm.precisions_cholesky_, gmm.precisions_cholesky_)
+    elif gmm.covariance_type == 'tied':
+        gmm.precisions_ = gmm.precisions_cholesky_ @ gmm.precisions_cholesky_.T
+    else:
+        gmm.precisions_ = gmm.precisions_cholesky_ ** 2
+
+
+def update_gmm(gmm, n_old, batch, scale=None, shift=None, n_iter=3):
+    """Warm-starts a fitted GaussianMixture on `batch` without revisiting the rows it was fitted on.
+
+    The mixture is first mapped through the affine change of scaling
+    `x * scale + shift`. The old rows are summarized by the sufficient
+    statistics the mixture implies for `n_old` rows; these are held fixed while
+    `n_iter` EM steps add the statistics of the new rows, so the cost depends on
+    `len(batch)` only.
+    """
+    weights, means, covariances = gmm.weights_, gmm.means_, _full_covariances(gmm)
+    if scale is not None:
+        means = means * scale + shift
+        covariances = covariances * np.outer(scale, scale)
+
+    old_counts = n_old * weights
+    old_sums = old_counts[:, None] * means
+    old_squares = old_counts[:, None, None] * (covariances + np.einsum('ki,kj->kij', means, means))
+    _set_gmm_parameters(gmm, weights, means, covariances)
+    if len(batch) == 0:
+        return gmm
+
+    eye = np.eye(batch.shape[1]) * gmm.reg_covar
+    for _ in range(n_iter):
+        resp = gmm.predict_proba(batch)
+        counts = old_counts + resp.sum(axis=0)
+        means = (old_sums + resp.T @ batch) / counts[:, None]
+        covariances = np.empty_like(old_squares)
+        for k in range(len(counts)):
+            squares = old_squares[k] + (batch * resp[:, k:k + 1]).T @ batch
+            covariances[k] = squares / counts[k] - np.outer(means[k], means[k]) + eye
+        _set_gmm_parameters(gmm, counts / counts.sum(), means, covariances)
+    return gmm
+
+
+def update_continuous_model(model, new_rows, drift_threshold=0.5, max_components=10,
+                            n_jobs=None, patience=3, max_block_size=16, fit_rows=50_000):
+    """Updates a model from `fit_continuous_model` with appended rows.
+
+    The scaler range is widened to cover the new rows and the mixtures are
+    warm-started from their previous parameters (see `update_gmm`). When the
+    new rows score more than `drift_threshold` nats per row below the fitted
+    log-likelihood, components are selected again by BIC, on the new rows plus
+    rows replayed from the old model instead of the full history.
+    """
+    features = model['features']
+    if model['kind'] == 'empty':
+        return fit_continuous_model(new_rows, features, max_components=max_components, n_jobs=n_jobs,
+                                    patience=patience, max_block_size=max_block_size, fit_rows=fit_rows)
+
+    clean_rows = new_rows[features].dropna()
+    if clean_rows.empty:
+        return model
+
+    model = copy.deepcopy(model)
+    old_scaler, n_old = model['scaler'], model['n_rows']
+    old_scaled = old_scaler.transform(clean_rows)
+    drift = model['log_likelihood'] - continuous_log_likelihood(model, old_scaled)
+    emit('drift', rows=len(clean_rows), drift=drift, threshold=drift_threshold)
+
+    scaler = copy.deepcopy(old_scaler).partial_fit(clean_rows)
+    scale = scaler.scale_ / old_scaler.scale_
+    shift = scaler.min_ - old_scaler.min_ * scale
+    scaled_data = scaler.transform(clean_rows)
+
+    if drift > drift_threshold:
+        print(f"Log-likelihood drift {drift:.4f} exceeds {drift_threshold}, reselecting components")
+        # The old rows are represented by samples of the old model, in proportion to their count
+        total = min(n_old + len(scaled_data), fit_rows or 50_000)
+        n_new = max(1, round(total * len(scaled_data) / (n_old + len(scaled_data))))
+        rng = np.random.default_rng(0)
+        new_part = scaled_data[rng.choice(len(scaled_data), min(n_new, len(scaled_data)), replace=False)]
+        replay = sample_continuous_model(model, total - len(new_part))
+        train = np.vstack([scaler.transform(replay), new_part]) if len(replay) else new_part
+        model['scaler'] = scaler
+        peaks = detect_modalities(pd.DataFrame(train), range(train.shape[1]))
+        anchors = peak_anchors(train, {i: centers for i, centers in peaks.items() if len(centers)})
+        model.update(_fit_scaled_model(train, model_type=model['kind'], max_components=max_components,
+                                       n_jobs=n_jobs, patience=patience,
+                                       max_block_size=max_block_size, anchors=anchors))
+        model.update(n_rows=n_old + len(scaled_data),
+                     log_likelihood=continuous_log_likelihood(model, train))
+        return model
+
+    print(f"Log-likelihood drift {drift:.4f}, updating the fitted components")
+    model['scaler'] = scaler
+    if model['kind'] == 'gmm':
+        update_gmm(model['gmm'], n_old, scaled_data, scale, shift)
+    elif model['kind'] == 'block_gmm':
+        for cols, gmm in model['blocks']:
+            update_gmm(gmm, n_old, scaled_data[:, cols], scale[cols], shift[cols])
+    elif model['kind'] == 'cluster_gmm':
+        # Each row joins the cluster that explains it best
+        sizes = np.array([size for size, _ in model['clusters']], dtype=float)
+        scores = np.column_stack([gmm.score_samples(old_scaled) for _, gmm in model['clusters']])
+        labels = (scores + np.log(sizes / sizes.sum())).argmax(axis=1)
+        model['clusters'] = [
+            (size + int((labels == i).sum()),
+             update_gmm(gmm, size, scaled_data[labels == i], scale, shift))
+            for i, (size, gmm) in enumerate(model['clusters'])
+        ]
+
+    # Rescaling shifts densities by the log-Jacobian of the new scaling
+    old_log_likelihood = model['log_likelihood'] - np.log(scale).sum()
+    new_log_likelihood = continuous_log_likelihood(model, scaled_data)
+    n_rows = n_old + len(scaled_data)
+    model.update(n_rows=n_rows,
+                 log_likelihood=(n_old * old_log_likelihood + len(scaled_data) * new_log_likelihood) / n_rows)
+    return model
+
+
+def update_synthetic_model(model, new_rows, drift_threshold=0.5, max_components=10, n_jobs=None,
+                           patience=3, max_block_size=16, fit_rows=50_000):
+    """Updates a model from `fit_synthetic_model` with rows appended to its input.
+
+    Frequency tables, conditional statistics, constraints and rounding are
+    updated from `new_rows` alone and the continuous model is warm-started
+    (see `update_continuous_model`), so the cost grows with the new rows
+    rather than with the whole history.
+    """
+    columns = model['continuous_features'] + model['discrete_features']
+    missing = [col for col in columns if col not in new_rows.columns]
+    if missing:
+        raise ValueError(f"New rows lack the modelled columns: {missing}")
+
+    with stage('profile', rows=len(new_rows), columns=len(columns)):
+        profile = profile_dataset(new_rows[columns])
+    with stage('update_continuous', rows=len(new_rows), columns=len(model['continuous_features'])):
+        continuous_model = update_continuous_model(
+            model['continuous_model'], new_rows, drift_threshold=drift_threshold,
+            max_components=max_components, n_jobs=n_jobs, patience=patience,
+            max_block_size=max_block_size, fit_rows=fit_rows
+        )
+    with stage('update_discrete', rows=len(new_rows), columns=len(model['discrete_features'])):
+        discrete_tables = update_discrete_model(model['discrete_tables'], new_rows)
+    with stage('conditional_stats', rows=len(new_rows)):
+        conditional_stats = (
+            update_conditional_stats(model['conditional_stats'], new_rows)
+            if model['preserve_correlations'] else None
+        )
+
+    # Ranges only widen; a column stays integer only if the new rows are whole numbers too
+    constraints = dict(model['constraints'])
+    for col, (min_val, max_val) in model['constraints'].items():
+        column = profile.columns.get(col)
+        if column is not None and column.is_numeric and column.n_valid:
+            constraints[col] = (min(min_val, column.min), max(max_val, column.max))
+    batch_rounding = compute_rounding_metadata(new_rows[columns], profile=profile)
+    integer_cols = [col for col in model['rounding']['integer_cols']
+                    if col in batch_rounding['integer_cols'] or not profile[col].n_valid]
+    decimal_places = {
+        col: max(model['rounding']['decimal_places'].get(col, 0), batch_rounding['decimal_places'].get(col, 0))
+        for col in list(model['rounding']['decimal_places']) + [
+            col for col in model['rounding']['integer_cols'] if col not in integer_cols]
+    }
+
+    return dict(model, continuous_model=continuous_model, discrete_tables=discrete_tables,
+                conditional_stats=conditional_stats, constraints=constraints,
+                rounding={'integer_cols': integer_cols, 'decimal_places': decimal_places},
+                n_rows=model['n_rows'] + len(new_rows))
+# ==================================================================================
+
+# ============================= CONDITIONAL GENERATION =======================
+def _log_interval_probability(low, high):
+    """log(Phi(high) - Phi(low)) of standardized bounds, accurate far in either tail."""
+    from scipy.special import log_ndtr
+    # Reflect intervals above the mean into the lower tail, where log_ndtr is accurate
+    flip = np.asarray(low) > 0
+    low, high = np.where(flip, -np.asarray(high), low), np.where(flip, -np.asarray(low), high)
+    log_high, log_low = log_ndtr(high), log_ndtr(low)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return log_high + np.log1p(-np.exp(log_low - log_high))
+
+
+def _truncated_gaussian(mean, cov, lows, highs, n_rows, rng, sweeps=0):
+    """Draws rows of a Gaussian restricted to the box [lows, highs].
+
+    Columns are first drawn one by one, each truncated given the earlier
+    ones. This start lies in the box but over-weights rows by the inverse of
+    the returned log importance weights (whose mean estimates the box mass).
+    `sweeps` Gibbs sweeps, each redrawing every column given all the others,
+    then move the rows towards the exact restricted distribution.
+    """
+    from scipy.stats import truncnorm
+    d = len(mean)
+    values = np.empty((n_rows, d))
+    log_importance = np.zeros(n_rows)
+
+    def draw(j, given):
+        loc, var = np.full(n_rows, mean[j]), cov[j, j]
+        if given:
+            gain = np.linalg.solve(cov[np.ix_(given, given)], cov[given, j])
+            loc = loc + (values[:, given] - mean[given]) @ gain
+            var = var - cov[j, given] @ gain
+        sd = np.sqrt(max(var, 1e-12))
+        a, b = (lows[j] - loc) / sd, (highs[j] - loc) / sd
+        values[:, j] = truncnorm.rvs(a, b, loc=loc, scale=sd, size=n_rows, random_state=rng)
+        return _log_interval_probability(a, b)
+
+    for j in range(d):
+        log_probability = draw(j, list(range(j)))
+        if j:
+            log_importance += log_probability
+    for _ in range(sweeps if d > 1 else 0):
+        for j in range(d):
+            draw(j, [i for i in range(d) if i != j])
+    return values, log_importance
+
+
+def sample_conditional_mixture(weights, means, covariances, n_samples, equal=None, ranges=None,
+                               random_state=None, gibbs_sweeps=10, pilot_rows=256):
+    """Draws rows from a Gaussian mixture given fixed values and ranges of some columns.
+
+    `equal` maps column indices to values and `ranges` to (low, high) bounds.
+    Fixed columns condition every component in closed form, which reweights
+    it by its density at the values. Components are then reweighted by their
+    mass inside the ranges: exact for one range, estimated from `pilot_rows`
+    sequential draws for several. Range columns are drawn from the truncated
+    component (see `_truncated_gaussian`, with `gibbs_sweeps` sweeps when
+    there are several ranges), and the remaining columns from the
+    component's conditional Gaussian given them.
+    """
+    from scipy.special import logsumexp
+    from scipy.stats import multivariate_normal
+    from sklearn.utils import check_random_state
+    rng = check_random_state(random_state)
+    equal, ranges = equal or {}, ranges or {}
+    n_components, n_features = means.shape
+
+    fixed = sorted(equal)
+    free = [i for i in range(n_features) if i not in equal]
+    fixed_values = np.array([equal[i] for i in fixed], dtype=float)
+    log_weights = np.log(weights)
+    cond_means = means[:, free].copy()
+    cond_covs = covariances[:, free][:, :, free].copy()
+    if fixed:
+        for k in range(n_components):
+            fixed_cov = covariances[k][np.ix_(fixed, fixed)]
+            cross_cov = covariances[k][np.ix_(free, fixed)]
+            gain = np.linalg.solve(fixed_cov, cross_cov.T).T
+            cond_means[k] += gain @ (fixed_values - means[k, fixed])
+            cond_covs[k] -= gain @ cross_cov.T
+            log_weights[k] += multivariate_normal.logpdf(fixed_values, means[k, fixed], fixed_cov)
+
+    # Range columns (positions among the free columns) and the rest
+    drawn = [free.index(col) for col in ranges]
+    lows = np.array([low for low, _ in ranges.values()], dtype=float)
+    highs = np.array([high for _, high in ranges.values()], dtype=float)
+    rest = [j for j in range(len(free)) if j not in drawn]
+    if len(drawn) == 1:
+        sd = np.sqrt(cond_covs[:, drawn[0], drawn[0]])
+        log_weights = log_weights + _log_interval_probability((lows[0] - cond_means[:, drawn[0]]) / sd,
+                                                              (highs[0] - cond_means[:, drawn[0]]) / sd)
+    elif drawn:
+        for k in range(n_components):
+            if not np.isfinite(log_weights[k]):
+                continue
+            box = np.ix_(drawn, drawn)
+            _, log_importance = _truncated_gaussian(cond_means[k, drawn], cond_covs[k][box], lows, highs,
+                                                    pilot_rows, rng)
+            sd = np.sqrt(cond_covs[k, drawn[0], drawn[0]])
+            log_weights[k] += (_log_interval_probability((lows[0] - cond_means[k, drawn[0]]) / sd,
+                                                         (highs[0] - cond_means[k, drawn[0]]) / sd)
+                               + logsumexp(log_importance) - np.log(pilot_rows))
+    if not np.isfinite(log_weights).any():
+        raise ValueError("The conditions have zero probability under the fitted model")
+    probs = np.exp(log_weights - log_weights.max())
+
+    components = rng.choice(n_components, size=n_samples, p=probs / probs.sum())
+    samples = np.empty((n_samples, n_features))
+    samples[:, fixed] = fixed_values
+    for k in np.unique(components):
+        rows = np.flatnonzero(components == k)
+        mean, cov = cond_means[k], cond_covs[k]
+        values = np.empty((len(rows), len(free)))
+        if drawn:
+            values[:, drawn], _ = _truncated_gaussian(mean[drawn], cov[np.ix_(drawn, drawn)], lows, highs,
+                                                      len(rows), rng, sweeps=gibbs_sweeps)
+        if rest:
+            loc, rest_cov = np.broadcast_to(mean[rest], (len(rows), len(rest))), cov[np.ix_(rest, rest)]
+            if drawn:
+                gain = np.linalg.solve(cov[np.ix_(drawn, drawn)], cov[np.ix_(drawn, rest)])
+                loc = loc + (values[:, drawn] - mean[drawn]) @ gain
+                rest_cov = rest_cov - cov[np.ix_(rest, drawn)] @ gain
+            chol = np.linalg.cholesky(rest_cov + np.eye(len(rest)) * 1e-12)
+            values[:, rest] = loc + rng.standard_normal((len(rows), len(rest))) @ chol.T
+        samples[np.ix_(rows, free)] = values
+
+    # Rows were drawn grouped by component
+    return samples[rng.permutation(n_samples)]
+
+
+def _mixture_parts(continuous_model):
+    """(columns, weights, means, full covariances, random_state) of each independent mixture."""
+    if continuous_model['kind'] == 'gmm':
+        gmm = continuous_model['gmm']
+        columns = list(range(len(continuous_model['features'])))
+        return [(columns, gmm.weights_, gmm.means_, _full_covariances(gmm), gmm.random_state)]
+    if continuous_model['kind'] == 'block_gmm':
+        return [(list(cols), gmm.weights_, gmm.means_, _full_covariances(gmm), gmm.random_state)
+                for cols, gmm in continuous_model['blocks']]
+    # The cluster models together form one mixture, weighted by cluster size
+    clusters = continuous_model['clusters']
+    total = sum(size for size, _ in clusters)
+    columns = list(range(len(continuous_model['features'])))
+    return [(
+        columns,
+        np.concatenate([gmm.weights_ * size / total for size, gmm in clusters]),
+        np.vstack([gmm.means_ for _, gmm in clusters]),
+        np.concatenate([_full_covariances(gmm) for _, gmm in clusters]),
+        clusters[0][1].random_state,
+    )]
+
+
+def sample_conditional_continuous(model, n_samples, equal=None, ranges=None):
+    """Samples a `fit_continuous_model` model given values ({feature: value}) and ranges ({feature: (low, high)})."""
+    equal, ranges = equal or {}, ranges or {}
+    if not equal and not ranges:
+        return sample_continuous_model(model, n_samples=n_samples)
+    if model['kind'] == 'empty':
+        raise ValueError("No continuous model was fitted to condition on")
+
+    # Conditions are mapped into the scaler's [0, 1] space
+    features, scaler = model['features'], model['scaler']
+    position = {feature: i for i, feature in enumerate(features)}
+    scale = lambda i, value: value * scaler.scale_[i] + scaler.min_[i]
+    scaled_equal = {position[col]: scale(position[col], value) for col, value in equal.items()}
+    scaled_ranges = {
+        position[col]: (-np.inf if low is None else scale(position[col], low),
+                        np.inf if high is None else scale(position[col], high))
+        for col, (low, high) in ranges.items()
+    }
+
+    synthetic_samples = np.empty((n_samples, len(features)))
+    for cols, weights, means, covariances, random_state in _mixture_parts(model):
+        local = {col: i for i, col in enumerate(cols)}
+        synthetic_samples[:, cols] = sample_conditional_mixture(
+            weights, means, covariances, n_samples,
+            equal={local[i]: value for i, value in scaled_equal.items() if i in local},
+            ranges={local[i]: bounds for i, bounds in scaled_ranges.items() if i in local},
+            random_state=random_state,
+        )
+
+    synthetic_continuous = pd.DataFrame(scaler.inverse_transform(synthetic_samples), columns=features)
+    # Undo round-off from the inverse scaling
+    for col, value in equal.items():
+        synthetic_continuous[col] = value
+    for col, (low, high) in ranges.items():
+        synthetic_continuous[col] = synthetic_continuous[col].clip(lower=low, upper=high)
+    return synthetic_continuous
+
+
+def restrict_discrete_table(table, allowed):
+    """The frequency table renormalized over the values where the boolean mask `allowed` holds."""
+    probs = np.where(allowed, table['probs'], 0.0)
+    if not probs.any():
+        raise ValueError("The conditions exclude every value of a discrete column")
+    probs = probs / probs.sum()
+    return dict(table, probs=probs, alias=alias_table(probs))
+
+
+def split_conditions(model, conditions):
+    """Sorts `conditions` into restricted discrete tables and continuous values and ranges.
+
+    A condition is a value, a list/set of values (discrete columns only) or a
+    (low, high) tuple for a range on a numeric column, with None for an open
+    end. Returns (discrete_tables, equal, ranges).
+    """
+    tables = dict(model['discrete_tables'])
+    equal, ranges = {}, {}
+    for col, condition in conditions.items():
+        if col in model['continuous_features']:
+            # Conditions are kept within the fitted constraints, which would clip the rows anyway
+            min_val, max_val = model['constraints'].get(col, (None, None))
+            if isinstance(condition, tuple):
+                low, high = condition
+                low = min_val if low is None else low if min_val is None else max(low, min_val)
+                high = max_val if high is None else high if max_val is None else min(high, max_val)
+                if low is not None and high is not None and low > high:
+                    raise ValueError(f"Range {condition} of {col} lies outside the fitted range {(min_val, max_val)}")
+                ranges[col] = (low, high)
+            elif np.ndim(condition) == 0:
+                if min_val is not None and not min_val <= condition <= max_val:
+                    raise ValueError(f"Value {condition} of {col} lies outside the fitted range {(min_val, max_val)}")
+                equal[col] = condition
+            else:
+                raise ValueError(f"Continuous column {col} takes a value or a (low, high) range")
+            continue
+
+        if col not in tables:
+            raise ValueError(f"Unknown column: {col}")
+        table = tables[col]
+        if table is None:
+            raise ValueError(f"Column {col} has no fitted values to condition on")
+        values = table['values']
+        if isinstance(condition, tuple):
+            low, high = condition
+            allowed = np.ones(len(values), dtype=bool)
+            if low is not None:
+                allowed &= values >= low
+            if high is not None:
+                allowed &= values <= high
+        else:
+            wanted = [condition] if np.ndim(condition) == 0 else list(condition)
+            allowed = values.isin(wanted)
+        tables[col] = restrict_discrete_table(table, np.asarray(allowed))
+    return tables, equal, ranges
+
+
+def parse_conditions(model, specs):
+    """Turns 'column=value', 'column=a,b,c' and 'column=low:high' strings into `conditions`.
+
+    Values are converted to the column's fitted type; either end of a range may be empty.
+    """
+    conditions = {}
+    for spec in specs:
+        col, sep, text = spec.partition('=')
+        col = col.strip()
+        if not sep or not col:
+            raise ValueError(f"Expected column=value, got: {spec}")
+        table = model['discrete_tables'].get(col)
+        if col in model['continuous_features']:
+            convert = float
+        elif table is not None and pd.api.types.is_bool_dtype(table['dtype']):
+            convert = _parse_bool
+        elif table is not None and table['dtype'] is not None:
+            convert = pd.to_numeric
+        else:
+            convert = str
+        if ':' in text:
+            low, high = (part.strip() for part in text.split(':', 1))
+            conditions[col] = (float(low) if low else None, float(high) if high else None)
+        elif ',' in text:
+            conditions[col] = [convert(value.strip()) for value in text.split(',')]
+        else:
+            conditions[col] = convert(text.strip())
+    return conditions
+
+
+def _parse_bool(text):
+    lowered = text.lower()
+    if lowered in ('true', '1'):
+        return True
+    if lowered in ('false', '0'):
+        return False
+    raise ValueError(f"Expected true or false, got: {text}")
+
+
+def condition_mask(data, conditions, continuous_features=()):
+    """Rows of `data` in the segment described by `conditions`.
+
+    Exact values of continuous columns are ignored, since they match (almost)
+    no real rows.
+    """
+    mask = pd.Series(True, index=data.index)
+    for col, condition in conditions.items():
+        if isinstance(condition, tuple):
+            low, high = condition
+            if low is not None:
+                mask &= data[col] >= low
+            if high is not None:
+                mask &= data[col] <= high
+        elif col not in continuous_features:
+            mask &= data[col].isin([condition] if np.ndim(condition) == 0 else list(condition))
+    return mask
+# ==================================================================================
+
+# ============================= ROUNDING METADATA =======================
+def compute_rounding_metadata(data, profile=None):
+    """Splits numeric columns into integer columns and float columns with their decimal places."""
+    if profile is None:
+        profile = profile_dataset(data)
+    numeric_cols = data.select_dtypes(include=['number']).columns
+    # Bool columns are sampled as 0.0/1.0 and written back as 0/1
+    bool_cols = data.select_dtypes(include=['bool']).columns
+    integer_cols = list(bool_cols) + [col for col in numeric_cols if profile[col].is_integer]
+    float_cols = [col for col in numeric_cols if col not in integer_cols]
+    return {
+        'integer_cols': integer_cols,
+        'decimal_places': {col: profile[col].decimal_places for col in float_cols},
+    }
+
+
+def apply_rounding(synthetic_data, rounding):
+    # Round float columns while keeping integer columns as whole numbers
+    for col, places in rounding['decimal_places'].items():
+        if col in synthetic_data.columns:
+            synthetic_data[col] = synthetic_data[col].round(places)
+    
+    # Convert integer columns back to int
+    for col in rounding['integer_cols']:
+        if col in synthetic_data.columns:
+            synthetic_data[col] = synthetic_data[col].astype(int)
+    return synthetic_data
+
+
+def format_output(synthetic_data, model, fmt='csv'):
+    # Typed formats store the input dtypes directly; CSV needs the textual rounding pass
+    if is_typed_format(fmt):
+        return restore_dtypes(synthetic_data, model['dtypes'])
+    return apply_rounding(synthetic_data, model['rounding'])
+# ==================================================================================
+
+# ========================== STREAM SYNTHETIC DATA ==============================================
+def _seed_continuous_model(continuous_model, random_state):
+    # gmm.sample() reseeds from an int random_state on every call, which would
+    # repeat the same rows in every chunk; share one advancing RandomState instead.
+    if 'gmm' in continuous_model:
+        continuous_model['gmm'].random_state = random_state
+    for _, gmm in continuous_model.get('clusters', []) + continuous_model.get('blocks', []):
+        gmm.random_state = random_state
+
+
+def stream_synthetic_data(model, n_samples, output_path, batch_size=100_000,
+                          real_df=None, seed=42, progress=None, fmt=None, conditions=None):
+    """Samples, adjusts, constrains, rounds and writes rows in fixed-size batches.
+
+    Peak memory depends on `batch_size`, not on `n_samples`. When `real_df` is
+    given, quality metrics are accumulated across batches and returned.
+    """
+    stream_model = dict(model, continuous_model=copy.deepcopy(model['continuous_model']))
+    _seed_continuous_model(stream_model['continuous_model'], np.random.RandomState(seed))
+
+    metrics = init_stream_metrics(real_df, model['discrete_features']) if real_df is not None else None
+
+    fmt = fmt or table_format(output_path)
+    written = 0
+    with open_table_writer(output_path, fmt) as write:
+        while written < n_samples:
+            size = min(batch_size, n_samples - written)
+            chunk = sample_synthetic_model(stream_model, n_samples=size, conditions=conditions)
+            if metrics is not None:
+                update_stream_metrics(metrics, chunk)
+            write(format_output(chunk, model, fmt))
+            written += size
+            print(f"Wrote {written}/{n_samples} rows")
+            emit('progress', stage='writing', rows=written, total=n_samples)
+            if progress is not None:
+                progress('writing', rows=written, total=n_samples)
+
+    return finalize_stream_metrics(metrics) if metrics is not None else None
+# ==================================================================================
+
+# =========================== RUN GENERATION =======================
+def run_generation(input_path, n_samples, public_dir, sample_only=False, model_type='gmm',
+                   max_components=10, max_block_size=16, fit_rows=50_000,
+                   patience=3, n_jobs=None, cache_dir=None, cache_size=8, no_cache=False,
+                   batch_size=100_000, eval_rows=100_000, plots=True, progress=None,
+                   columns=None, output_format=None, update=False, drift_threshold=0.5,
+                   where=None):
+    """Runs the full CLI pipeline (cache lookup, fit, sample, evaluate, round, write).
+
+    With `plots=False` no plotting library is imported; the figures can be
+    rendered later with `render_visualizations`. `progress`, if given, is called as progress(stage, **info) at each stage so
+    long-lived callers such as `worker.py` can report job status; the same
+    updates, plus per-stage timings, are sent as `instrumentation` events.
+    Returns the output path and the quality metrics (None in sample-only mode).
+
+    The input may be CSV, Parquet or Arrow IPC; `columns` restricts it to a
+    subset of columns. The output uses `output_format` (default: the input's).
+
+    With `update`, a file that only had rows appended since its last fit is not
+    refitted: the latest cached model for this path is updated with the new
+    rows (see `update_synthetic_model`).
+
+    `where` ('column=value', 'column=a,b' or 'column=low:high' strings, see
+    `parse_conditions`) generates one segment only; its quality is measured
+    against the real rows of that segment.
+    """
+    def report(name, **info):
+        emit('progress', stage=name, **info)
+        if progress is not None:
+            progress(name, **info)
+
+    # Check if input file exists
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"Input file not found: {input_path}")
+        
+    print(f"Reading data from: {input_path}")
+    print(f"Will generate {n_samples} samples")
+    report('reading')
+    
+    fit_params = {'model_type': model_type, 'max_components': max_components, 'patience': patience}
+    if model_type == 'block_gmm':
+        fit_params['max_block_size'] = max_block_size
+    if fit_rows:
+        fit_params['fit_rows'] = fit_rows
+    if columns:
+        fit_params['columns'] = list(columns)
+    cache_dir = cache_dir or model_store.default_cache_dir(input_path)
+    cache_key = model_store.input_fingerprint(input_path, fit_params)
+    cache_alias = model_store.input_alias(input_path, fit_params)
+    model = None if no_cache else model_store.load_artifact(cache_dir, cache_key)
+    
+    data = None
+    quality_metrics = None
+    if sample_only:
+        if model is None:
+            raise FileNotFoundError(
+                f"No fitted model found for {input_path}; run once without --sample_only first"
+            )
+        print("Sampling from cached model...")
+    else:
+        with stage('read', format=table_format(input_path)) as record:
+            data = read_table(input_path, columns=columns)
+            record.update(rows=len(data), columns=data.shape[1])
+        
+        previous = None
+        if model is None and update and not no_cache:
+            previous = model_store.load_latest(cache_dir, cache_alias)
+            if previous is not None and not (
+                    previous['n_rows'] < len(data)
+                    and set(previous['continuous_features'] + previous['discrete_features']) == set(data.columns)):
+                print("Input does not extend the previously fitted rows, refitting")
+                previous = None
+            elif previous is not None and previous.get('rows_digest') != rows_digest(
+                    data.iloc[:previous['n_rows']][previous.get('columns', list(data.columns))]):
+                print("Previously fitted rows have changed, refitting")
+                previous = None
+
+        if previous is not None:
+            new_rows = data.iloc[previous['n_rows']:]
+            print(f"Updating cached model with {len(new_rows)} new rows...")
+            report('updating', rows=len(new_rows))
+            with stage('update', rows=len(new_rows), total_rows=len(data)):
+                model = update_synthetic_model(
+                    previous, new_rows, drift_threshold=drift_threshold,
+                    max_components=max_components, n_jobs=n_jobs, patience=patience,
+                    max_block_size=max_block_size, fit_rows=fit_rows
+                )
+            model.update(columns=list(data.columns), rows_digest=rows_digest(data))
+            model_store.save_artifact(model, cache_dir, cache_key, max_entries=cache_size)
+        elif model is None:
+            print("Generating synthetic data...")
+            report('fitting', rows=len(data))
+            with stage('fit', rows=len(data), model_type=model_type):
+                model = fit_synthetic_model(
+                    data, model_type=model_type, max_components=max_components,
+                    n_jobs=n_jobs, patience=patience, max_block_size=max_block_size,
+                    fit_rows=fit_rows
+                )
+            if not no_cache:
+                # Lets a later --update verify that the file only had rows appended
+                model.update(columns=list(data.columns), rows_digest=rows_digest(data))
+                model_store.save_artifact(model, cache_dir, cache_key, max_entries=cache_size)
+        else:
+            print("Generating synthetic data from cached model...")
+        if not no_cache:
+            model_store.save_latest(cache_dir, cache_alias, cache_key, max_entries=cache_size)
+    
+    conditions = None
+    if where:
+        conditions = parse_conditions(model, where)
+        print(f"Generating rows where: {conditions}")
+        if data is not None:
+            data = data[condition_mask(data, conditions, model['continuous_features'])]
+            if data.empty:
+                print("No real rows fall in this segment, skipping the quality metrics")
+                data = None
+    
+    fmt = output_format or table_format(input_path)
+    output_path = output_path_for(input_path, public_dir, fmt)
+    
+    report('sampling', total=n_samples)
+    if n_samples > batch_size:
+        print(f"Streaming {n_samples} samples in batches of {batch_size}...")
+        if data is not None and plots:
+            # Visualizations are drawn from one batch-sized preview
+            report('evaluating')
+            with stage('render_plots'):
+                preview = sample_synthetic_model(model, n_samples=min(batch_size, 10_000), conditions=conditions)
+                render_evaluation_plots(data, preview, model['discrete_features'], public_dir)
+                del preview
+        with stage('stream', rows=n_samples, batch_size=batch_size, format=fmt):
+            quality_metrics = stream_synthetic_data(
+                model, n_samples, output_path, batch_size=batch_size, real_df=data,
+                progress=progress, fmt=fmt, conditions=conditions
+            )
+        if quality_metrics and quality_metrics.correlation:
+            print("\nCorrelation Differences (all batches):")
+            print(f"Maximum: {quality_metrics.correlation['max_diff']:.4f}")
+            print(f"Average: {quality_metrics.correlation['avg_diff']:.4f}")
+    else:
+        if data is None:
+            with stage('sample', rows=n_samples):
+                synthetic_data = sample_synthetic_model(model, n_samples=n_samples, conditions=conditions)
+        else:
+            report('evaluating')
+            synthetic_data, quality_metrics = generate_synthetic_data(
+                data, n_samples=n_samples, public_dir=public_dir, model=model,
+                plots=plots, eval_rows=eval_rows, conditions=conditions
+            )
+        
+        print("Processing generated data...")
+        report('writing', rows=0, total=n_samples)
+        with stage('write', rows=n_samples, format=fmt):
+            synthetic_data = format_output(synthetic_data, model, fmt)
+            # Save cleaned synthetic dataset
+            write_table(synthetic_data, output_path, fmt)
+    print(f"Synthetic data saved to: {output_path}")
+    report('done', output=output_path)
+    return output_path, quality_metrics
+
+
+def render_visualizations(input_path, public_dir, synthetic_path=None, max_rows=10_000,
+                          output_format=None):
+    """Renders the evaluation figures for an existing synthetic output as a separate step."""
+    if synthetic_path is None:
+        synthetic_path = output_path_for(input_path, public_dir, output_format)
+    if not os.path.exists(synthetic_path):
+        raise FileNotFoundError(f"Synthetic data not found: {synthetic_path}")
+
+    # Sampled rows are shuffled before they are written, so the first rows are a fair sample
+    synthetic_data = read_table(synthetic_path, nrows=max_rows)
+    # Only read the input columns that were modelled
+    data = read_table(input_path, columns=list(synthetic_data.columns))
+    continuous_features, _ = identify_feature_types(data)
+    discrete_features = [col for col in data.columns if col not in continuous_features]
+
+    print(f"Rendering visualizations into: {public_dir}")
+    render_evaluation_plots(data, synthetic_data, discrete_features, public_dir, max_rows=max_rows)
 # ==================================================================================
 
 # =========================== MAIN FUNCTION (ENTRY POINT)=======================
 def main():
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Generate synthetic data using GMM')
-    parser.add_argument('--input', type=str, required=True, help='Input CSV file path')
-    parser.add_argument('--samples', type=int, required=True, help='Number of samples to generate')
+    parser.add_argument('--input', type=str, required=True, help='Input CSV, Parquet or Arrow IPC file path')
+    parser.add_argument('--columns', type=str, default=None,
+                        help='Comma-separated subset of input columns to read and model')
+    parser.add_argument('--output_format', choices=['csv', 'parquet', 'arrow'], default=None,
+                        help='Synthetic output format (default: same as the input)')
+    parser.add_argument('--samples', type=int, default=None, help='Number of samples to generate')
     parser.add_argument('--public_dir', type=str, required=True, help='Public directory for saving visualizations')
+    parser.add_argument('--model_type', choices=['gmm', 'block_gmm', 'cluster_gmm'], default='gmm',
+                        help="'block_gmm' fits one mixture per block of correlated columns (for wide tables), "
+                             "'cluster_gmm' one mixture per k-means cluster of rows")
+    parser.add_argument('--max_components', type=int, default=10, help='Largest number of GMM components to try')
+    parser.add_argument('--max_block_size', type=int, default=16, help='Largest column block for block_gmm')
+    parser.add_argument('--fit_rows', type=int, default=50_000,
+                        help='Starting subsample size for fitting large inputs (0 fits on every row)')
+    parser.add_argument('--patience', type=int, default=3,
+                        help='Stop the BIC sweep after this many candidates without improvement (0 = exhaustive)')
+    parser.add_argument('--n_jobs', type=int, default=None, help='Worker processes for the BIC sweep (default: all cores)')
+    
+    parser.add_argument('--where', action='append', default=None, metavar='COLUMN=VALUE',
+                        help="Only generate rows of one segment: 'col=value', 'col=a,b' (any of these values) "
+                             "or 'col=low:high' (range, either end may be empty). Repeatable")
+    parser.add_argument('--sample_only', action='store_true',
+                        help='Only sample from the cached model fitted on this input (no refit, no evaluation)')
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help='Directory for fitted model artifacts (default: .model_cache next to the input)')
+    parser.add_argument('--cache_size', type=int, default=8, help='Maximum number of cached model artifacts')
+    parser.add_argument('--no_cache', action='store_true', help='Always refit and do not store the fitted model')
+    parser.add_argument('--update', action='store_true',
+                        help='If rows were appended to the input since its last fit, update that model '
+                             'with the new rows instead of refitting')
+    parser.add_argument('--drift_threshold', type=float, default=0.5,
+                        help='Log-likelihood drop per row of the new rows above which --update reselects components')
+    parser.add_argument('--batch_size', type=int, default=100_000,
+                        help='Rows generated and written per batch when --samples exceeds it')
+    parser.add_argument('--eval_rows', type=int, default=100_000,
+                        help='Rows per table sampled (stratified) for quality metrics (0 = all rows)')
+    parser.add_argument('--no_plots', '--metrics_only', dest='no_plots', action='store_true',
+                        help='Compute quality metrics only; plotting libraries are never imported')
+    parser.add_argument('--plots_only', action='store_true',
+                        help='Only render visualizations for an existing synthetic output in public_dir')
+    parser.add_argument('--events', type=str, default=None,
+                        help="Write per-stage instrumentation events as JSON lines to this file ('-' = stderr)")
+    parser.add_argument('--profile', type=str, nargs='?', const='', default=None,
+                        help='Run under cProfile, print the top functions and optionally dump the stats to this file')
     
     args = parser.parse_args()
+    if args.samples is None and not args.plots_only:
+        parser.error('--samples is required unless --plots_only is given')
     
+    columns = [col.strip() for col in args.columns.split(',')] if args.columns else None
+    events_file = None
+    if args.events:
+        if args.events == '-':
+            events_file = sys.stderr
+        else:
+            # Append mode keeps lines intact when forked pool workers emit events too
+            open(args.events, 'w').close()
+            events_file = open(args.events, 'a')
     try:
-        # Check if input file exists
-        if not os.path.exists(args.input):
-            raise FileNotFoundError(f"Input file not found: {args.input}")
-            
-        print(f"Reading data from: {args.input}")
-        print(f"Will generate {args.samples} samples")
-        data = pd.read_csv(args.input)
-        
-        print("Generating synthetic data...")
-        synthetic_data, quality_metrics = generate_synthetic_data(
-            data, n_samples=args.samples, model_type='gmm', public_dir=args.public_dir
-        )
-        
-        print("Processing generated data...")
-        # Identify numeric columns
-        numeric_cols = synthetic_data.select_dtypes(include=['number']).columns
-        
-        # Function to detect if a column should be integer
-        def is_integer_column(series):
-            return series.dropna().apply(lambda x: isinstance(x, (int, float)) and float(x).is_integer()).all()
-        
-        # Split columns into integer and float based on original data
-        integer_cols = [col for col in numeric_cols if is_integer_column(data[col])]
-        float_cols = [col for col in numeric_cols if col not in integer_cols]
-        
-        # Get decimal places for float columns
-        decimal_places = {col: detect_decimal_places(data[col]) for col in float_cols}
-        
-        # Round float columns while keeping integer columns as whole numbers
-        for col, places in decimal_places.items():
-            synthetic_data[col] = synthetic_data[col].round(places)
-        
-        # Convert integer columns back to int
-        for col in integer_cols:
-            synthetic_data[col] = synthetic_data[col].astype(int)
-        
-        # Save cleaned synthetic dataset
-        name, _ = os.path.splitext(os.path.basename(args.input))
-        output_path = os.path.join(args.public_dir, f'{name}_SYNTHETIC.csv')
-        synthetic_data.to_csv(output_path, index=False)
-        print(f"Synthetic data saved to: {output_path}")
-        
+        with event_sink(json_lines_sink(events_file) if events_file else None), \
+                profiled(args.profile or None) if args.profile is not None else nullcontext():
+            if args.plots_only:
+                render_visualizations(args.input, args.public_dir, output_format=args.output_format)
+                return
+            run_generation(
+                args.input, args.samples, args.public_dir, sample_only=args.sample_only,
+                model_type=args.model_type, max_components=args.max_components,
+                max_block_size=args.max_block_size, fit_rows=args.fit_rows or None, patience=args.patience or None,
+                n_jobs=args.n_jobs, cache_dir=args.cache_dir, cache_size=args.cache_size,
+                no_cache=args.no_cache, batch_size=args.batch_size, eval_rows=args.eval_rows or None,
+                plots=not args.no_plots, columns=columns, output_format=args.output_format,
+                update=args.update, drift_threshold=args.drift_threshold, where=args.where
+            )
     except Exception as e:
         print(f"Error: {str(e)}")
         raise
+    finally:
+        if events_file is not None and events_file is not sys.stderr:
+            events_file.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,203 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from GMM_Model import (preserve_feature_correlations, identify_feature_types, detect_modality,
+                       detect_modalities, compute_rounding_metadata, fit_continuous_model,
+                       sample_continuous_model)
+from dataset_profile import profile_dataset
+from evaluation import evaluate_metrics
+
+# ================= SYNTHETIC BENCHMARK TABLES ======================================
+def make_benchmark_table(n_rows=10_000, n_continuous=100, n_discrete=10, cardinality=50, seed=0):
+    """Builds a numeric table whose continuous columns depend on integer-coded discrete columns."""
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, cardinality, size=(n_rows, n_discrete))
+    shift = codes @ rng.normal(size=(n_discrete, n_continuous)) / n_discrete
+    continuous = rng.normal(size=(n_rows, n_continuous)) + shift
+
+    table = pd.DataFrame(continuous, columns=[f'cont_{i}' for i in range(n_continuous)])
+    for i in range(n_discrete):
+        table[f'code_{i}'] = codes[:, i]
+    return table
+
+
+def make_block_table(n_rows=10_000, n_continuous=100, block_size=5, seed=0):
+    """Builds a wide table of independent column blocks, each driven by one shared latent factor."""
+    rng = np.random.default_rng(seed)
+    block_ids = np.arange(n_continuous) // block_size
+    factors = rng.normal(size=(n_rows, block_ids.max() + 1))
+    # A second mode per block keeps the mixtures non-trivial
+    factors += 3 * (rng.random(factors.shape) < 0.3)
+    loadings = rng.uniform(0.6, 1.0, size=n_continuous)
+    continuous = factors[:, block_ids] * loadings + rng.normal(scale=0.5, size=(n_rows, n_continuous))
+    return pd.DataFrame(continuous, columns=[f'cont_{i}' for i in range(n_continuous)])
+# ========================================================================
+
+# ================= PRESERVE FEATURE CORRELATIONS ======================================
+def _reference_preserve_feature_correlations(cont_df, disc_df, original_data, strength=0.5):
+    """The original per-value/per-column loop, kept as the correctness and speed baseline."""
+    result_df = cont_df.copy()
+
+    for col in disc_df.columns:
+        result_df[col] = disc_df[col].values
+
+    for disc_col in disc_df.columns:
+        if not pd.api.types.is_numeric_dtype(original_data[disc_col]):
+            continue
+
+        for value in original_data[disc_col].unique():
+            synth_mask = result_df[disc_col] == value
+            orig_mask = original_data[disc_col] == value
+
+            if orig_mask.sum() == 0 or synth_mask.sum() == 0:
+                continue
+
+            for cont_col in cont_df.columns:
+                orig_cond_mean = original_data.loc[orig_mask, cont_col].mean()
+                orig_cond_std = original_data.loc[orig_mask, cont_col].std()
+
+                if np.isnan(orig_cond_std) or orig_cond_std == 0:
+                    continue
+
+                synth_mean = result_df.loc[synth_mask, cont_col].mean()
+                synth_std = result_df.loc[synth_mask, cont_col].std()
+
+                if np.isnan(synth_std) or synth_std == 0:
+                    continue
+
+                std_values = (result_df.loc[synth_mask, cont_col] - synth_mean) / synth_std
+                adjusted_values = (std_values * orig_cond_std) + orig_cond_mean
+
+                result_df.loc[synth_mask, cont_col] = (
+                    (1 - strength) * result_df.loc[synth_mask, cont_col] +
+                    strength * adjusted_values
+                )
+
+    return result_df
+
+
+def benchmark_preserve_correlations(n_rows=10_000, n_continuous=100, n_discrete=10,
+                                    cardinality=50, reference=True):
+    original = make_benchmark_table(n_rows, n_continuous, n_discrete, cardinality, seed=0)
+    synthetic = make_benchmark_table(n_rows, n_continuous, n_discrete, cardinality, seed=1)
+    cont_cols = [col for col in synthetic.columns if col.startswith('cont_')]
+    disc_cols = [col for col in synthetic.columns if col.startswith('code_')]
+    cont_df, disc_df = synthetic[cont_cols], synthetic[disc_cols]
+
+    start = time.perf_counter()
+    result = preserve_feature_correlations(cont_df, disc_df, original)
+    timings = {'vectorized': time.perf_counter() - start}
+
+    if reference:
+        start = time.perf_counter()
+        expected = _reference_preserve_feature_correlations(cont_df, disc_df, original)
+        timings['reference'] = time.perf_counter() - start
+        timings['speedup'] = timings['reference'] / timings['vectorized']
+        timings['max_abs_diff'] = float(np.abs(result[cont_cols].to_numpy() - expected[cont_cols].to_numpy()).max())
+    return timings
+# ========================================================================
+
+# ================= DATASET PROFILE ======================================
+def _reference_is_integer_column(series):
+    return series.dropna().apply(lambda x: isinstance(x, (int, float)) and float(x).is_integer()).all()
+
+
+def _reference_detect_decimal_places(series):
+    decimals = series.astype(str).str.split('.').str[-1]
+    decimals = decimals[decimals.str.isnumeric()]
+    return decimals.str.len().max() or 0
+
+
+def _reference_profile_scans(data):
+    """The per-stage rescans that the single-pass DatasetProfile replaces."""
+    continuous_features, _ = identify_feature_types(data)
+    for feature in continuous_features:
+        detect_modality(data, feature)
+    constraints = {col: (data[col].min(), data[col].max())
+                   for col in data.columns if pd.api.types.is_numeric_dtype(data[col])}
+    numeric_cols = data.select_dtypes(include=['number']).columns
+    integer_cols = [col for col in numeric_cols if _reference_is_integer_column(data[col])]
+    decimal_places = {col: _reference_detect_decimal_places(data[col])
+                      for col in numeric_cols if col not in integer_cols}
+    return constraints, integer_cols, decimal_places
+
+
+def _profile_scans(data):
+    profile = profile_dataset(data)
+    continuous_features, _ = identify_feature_types(data, profile=profile)
+    detect_modalities(data, continuous_features, profile=profile)
+    constraints = {col: (column.min, column.max)
+                   for col, column in profile.columns.items() if column.is_numeric}
+    return constraints, compute_rounding_metadata(data, profile=profile)
+
+
+def benchmark_profile(n_rows=100_000, n_continuous=40, n_discrete=10, cardinality=50, reference=True):
+    data = make_benchmark_table(n_rows, n_continuous, n_discrete, cardinality, seed=0)
+    # Mimic CSV-sourced values with a fixed number of decimals
+    cont_cols = [col for col in data.columns if col.startswith('cont_')]
+    data[cont_cols] = data[cont_cols].round(3)
+
+    start = time.perf_counter()
+    _profile_scans(data)
+    timings = {'profile': time.perf_counter() - start}
+
+    if reference:
+        start = time.perf_counter()
+        _reference_profile_scans(data)
+        timings['reference'] = time.perf_counter() - start
+        timings['speedup'] = timings['reference'] / timings['profile']
+    return timings
+# ========================================================================
+
+# ================= BLOCK-FACTORIZED GMM ======================================
+def benchmark_block_gmm(n_rows=10_000, n_continuous=40, block_size=5, max_components=5,
+                        max_block_size=16, reference=True):
+    """Fit time and correlation fidelity of block_gmm, against a single full-width GMM."""
+    data = make_block_table(n_rows, n_continuous, block_size, seed=0)
+    features = list(data.columns)
+    model_types = ['block_gmm', 'gmm'] if reference else ['block_gmm']
+
+    results = {}
+    for model_type in model_types:
+        start = time.perf_counter()
+        model = fit_continuous_model(data, features, model_type=model_type,
+                                     max_components=max_components, max_block_size=max_block_size)
+        results[f'{model_type}_fit'] = time.perf_counter() - start
+        synthetic = sample_continuous_model(model, n_rows)
+        metrics = evaluate_metrics(data, synthetic)
+        results[f'{model_type}_corr_avg_diff'] = metrics.correlation['avg_diff']
+        results[f'{model_type}_ks_mean'] = float(np.mean([ks['KS statistic'] for ks in metrics.ks.values()]))
+    if reference:
+        results['speedup'] = results['gmm_fit'] / results['block_gmm_fit']
+    return results
+# ========================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark individual generation stages')
+    parser.add_argument('--stage', choices=['correlations', 'profile', 'block_gmm'], default='correlations')
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--continuous', type=int, default=100)
+    parser.add_argument('--discrete', type=int, default=10)
+    parser.add_argument('--cardinality', type=int, default=50)
+    parser.add_argument('--block_size', type=int, default=5, help='Columns per latent block (block_gmm stage)')
+    parser.add_argument('--max_components', type=int, default=5, help='block_gmm stage only')
+    parser.add_argument('--no_reference', action='store_true', help='Skip the slow reference implementation')
+    args = parser.parse_args()
+
+    if args.stage == 'block_gmm':
+        timings = benchmark_block_gmm(
+            n_rows=args.rows, n_continuous=args.continuous, block_size=args.block_size,
+            max_components=args.max_components, reference=not args.no_reference
+        )
+    else:
+        benchmark = benchmark_profile if args.stage == 'profile' else benchmark_preserve_correlations
+        timings = benchmark(
+            n_rows=args.rows, n_continuous=args.continuous, n_discrete=args.discrete,
+            cardinality=args.cardinality, reference=not args.no_reference
+        )
+    for name, value in timings.items():
+        print(f"{name}: {value:.6g}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from GMM_Model import (fit_synthetic_model, sample_continuous_model, sample_discrete_model,
+                       preserve_feature_correlations, enforce_constraints, evaluate_synthetic_data,
+                       format_output)
+from table_io import write_table
+from instrumentation import peak_rss_mb, event_sink
+
+# Named table shapes; `--cases` picks from these, `--rows` etc. define a 'custom' case
+BENCHMARK_CASES = {
+    'small': {'n_rows': 10_000, 'n_continuous': 8, 'n_discrete': 4, 'cardinality': 5, 'modes': 2},
+    'wide': {'n_rows': 10_000, 'n_continuous': 60, 'n_discrete': 10, 'cardinality': 5, 'modes': 2},
+    'tall': {'n_rows': 200_000, 'n_continuous': 8, 'n_discrete': 4, 'cardinality': 5, 'modes': 3},
+    'high_cardinality': {'n_rows': 50_000, 'n_continuous': 8, 'n_discrete': 4, 'cardinality': 1_000, 'modes': 2},
+}
+
+# Innermost stages reported by `fit_synthetic_model`; 'fit_continuous' wraps
+# 'detect_modality' and 'fit_mixture'
+FIT_STAGES = ['profile', 'identify_feature_types', 'detect_modality', 'fit_mixture',
+              'fit_discrete', 'conditional_stats', 'rounding_metadata']
+
+# ================= SYNTHETIC INPUT TABLES ======================================
+def make_pipeline_table(n_rows=10_000, n_continuous=8, n_discrete=4, cardinality=5, modes=2, seed=0):
+    """Builds a mixed table like a typical upload.
+
+    Continuous columns are mixtures of `modes` Gaussians whose means shift
+    with the discrete codes. Half of the discrete columns are strings and the
+    other half integers, and one continuous column is integer-valued.
+    """
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, cardinality, size=(n_rows, n_discrete))
+    mode = rng.integers(0, modes, size=(n_rows, n_continuous))
+    centers = rng.uniform(-5, 5, size=(modes, n_continuous))
+    shift = codes @ rng.normal(scale=0.5, size=(n_discrete, n_continuous)) / max(n_discrete, 1)
+    continuous = centers[mode, np.arange(n_continuous)] + rng.normal(size=(n_rows, n_continuous)) + shift
+
+    table = pd.DataFrame(continuous.round(3), columns=[f'cont_{i}' for i in range(n_continuous)])
+    if n_continuous:
+        table['cont_0'] = (table['cont_0'] * 100).round().astype(int)
+    for i in range(n_discrete):
+        table[f'disc_{i}'] = codes[:, i] if i % 2 else pd.Series(codes[:, i]).map('cat_{}'.format)
+    return table
+# ========================================================================
+
+# ================= STAGE TIMINGS ======================================
+def time_pipeline_stages(data, n_samples=10_000, max_components=10, patience=3, n_jobs=None):
+    """Runs every generation stage once on `data` and returns {stage: seconds}.
+
+    Stage output is discarded so the timings are not dominated by printing.
+    The fit is broken down into the stages it reports itself, plus 'fit_other'
+    for the rest, so the stages add up to the time actually spent.
+    """
+    timings = {}
+
+    def timed(stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            result = fn(*args, **kwargs)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    # scikit-learn is imported lazily by the fit; keep the one-off import out of the timings
+    import sklearn.mixture, sklearn.preprocessing, sklearn.cluster
+    fit_stages = dict.fromkeys(FIT_STAGES, 0.0)
+
+    def record(event):
+        if event['event'] == 'stage_end' and event['stage'] in fit_stages:
+            fit_stages[event['stage']] += event['seconds']
+
+    with event_sink(record):
+        model = timed('fit', fit_synthetic_model, data, max_components=max_components,
+                      n_jobs=n_jobs, patience=patience)
+    fit_seconds = timings.pop('fit')
+    timings.update(fit_stages)
+    timings['fit_other'] = max(fit_seconds - sum(fit_stages.values()), 0.0)
+
+    synthetic_continuous = timed('sample_continuous', sample_continuous_model,
+                                 model['continuous_model'], n_samples)
+    synthetic_discrete = timed('sample_discrete', sample_discrete_model, model['discrete_tables'], n_samples)
+    if model['preserve_correlations']:
+        synthetic = timed('preserve_feature_correlations', preserve_feature_correlations,
+                          synthetic_continuous, synthetic_discrete, None,
+                          conditional_stats=model['conditional_stats'])
+    else:
+        synthetic = pd.concat([synthetic_continuous, synthetic_discrete], axis=1)
+    synthetic = timed('enforce_constraints', enforce_constraints, synthetic, constraints=model['constraints'])
+    timed('evaluate_synthetic_data', evaluate_synthetic_data, data, synthetic,
+          model['discrete_features'], plots=False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def post_process(df):
+            write_table(format_output(df, model, 'csv'), os.path.join(tmp, 'synthetic.csv'))
+        timed('post_processing', post_process, synthetic)
+    return timings
+
+
+def run_case(config, n_samples=10_000, repeat=1, max_components=10, patience=3, n_jobs=None):
+    """Best-of-`repeat` stage timings for one table configuration, plus peak RSS."""
+    data = make_pipeline_table(**config)
+    runs = [time_pipeline_stages(data, n_samples=n_samples, max_components=max_components,
+                                 patience=patience, n_jobs=n_jobs)
+            for _ in range(repeat)]
+    stages = {stage: min(run[stage] for run in runs) for stage in runs[0]}
+    own, children = peak_rss_mb()
+    return {
+        'config': dict(config, n_samples=n_samples), 'stages': stages,
+        'total': sum(stages.values()), 'peak_rss_mb': own, 'peak_child_rss_mb': children,
+    }
+# ========================================================================
+
+# ================= BASELINES ======================================
+def environment_info():
+    from importlib.metadata import version
+    return {
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'cpu_count': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__,
+        'scikit-learn': version('scikit-learn'),
+    }
+
+
+def compare_to_baseline(results, baseline, threshold=0.25, min_seconds=0.05):
+    """Returns a list of regression messages.
+
+    A stage regresses when it is more than `threshold` slower than the
+    baseline. Stages shorter than `min_seconds` in both runs are ignored as
+    noise. Peak RSS is checked against the same relative threshold.
+    """
+    regressions = []
+    for case, result in results['cases'].items():
+        base = baseline.get('cases', {}).get(case)
+        if base is None:
+            continue
+        if base['config'] != result['config']:
+            regressions.append(f"{case}: configuration differs from the baseline, not compared")
+            continue
+        for stage, seconds in result['stages'].items():
+            base_seconds = base['stages'].get(stage)
+            if base_seconds is None or max(seconds, base_seconds) < min_seconds:
+                continue
+            if seconds > base_seconds * (1 + threshold):
+                regressions.append(f"{case}/{stage}: {seconds:.3f}s vs baseline {base_seconds:.3f}s "
+                                   f"(+{(seconds / base_seconds - 1) * 100:.0f}%)")
+        if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold):
+            regressions.append(f"{case}/peak_rss: {result['peak_rss_mb']:.0f}MB vs baseline "
+                               f"{base['peak_rss_mb']:.0f}MB")
+    return regressions
+# ========================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Time every generation stage and compare with a stored baseline')
+    parser.add_argument('--cases', type=str, default='small',
+                        help=f"Comma-separated cases from {sorted(BENCHMARK_CASES)} or 'custom'")
+    parser.add_argument('--rows', type=int, default=10_000, help='custom case only')
+    parser.add_argument('--continuous', type=int, default=8, help='custom case only')
+    parser.add_argument('--discrete', type=int, default=4, help='custom case only')
+    parser.add_argument('--cardinality', type=int, default=5, help='custom case only')
+    parser.add_argument('--modes', type=int, default=2, help='custom case only')
+    parser.add_argument('--samples', type=int, default=10_000, help='Synthetic rows per case')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case; the fastest run of each stage is kept')
+    parser.add_argument('--max_components', type=int, default=10)
+    parser.add_argument('--patience', type=int, default=3)
+    parser.add_argument('--n_jobs', type=int, default=None)
+    parser.add_argument('--output', type=str, default=None, help='Write the results as JSON (e.g. a new baseline)')
+    parser.add_argument('--baseline', type=str, default=None, help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Relative slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    configs = dict(BENCHMARK_CASES, custom={
+        'n_rows': args.rows, 'n_continuous': args.continuous, 'n_discrete': args.discrete,
+        'cardinality': args.cardinality, 'modes': args.modes,
+    })
+    cases = [case.strip() for case in args.cases.split(',') if case.strip()]
+    unknown = [case for case in cases if case not in configs]
+    if unknown:
+        parser.error(f"Unknown cases: {unknown}")
+
+    results = {'environment': environment_info(), 'cases': {}}
+    for case in cases:
+        print(f"Running case '{case}': {configs[case]}")
+        # A fresh process per case keeps the peak RSS of one case out of the next
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(
+                run_case, configs[case], n_samples=args.samples, repeat=args.repeat,
+                max_components=args.max_components, patience=args.patience or None,
+                n_jobs=args.n_jobs
+            ).result()
+        results['cases'][case] = result
+        for stage, seconds in result['stages'].items():
+            print(f"  {stage:<32}{seconds:>10.4f}s")
+        print(f"  {'total':<32}{result['total']:>10.4f}s")
+        print(f"  {'peak RSS':<32}{result['peak_rss_mb']:>9.0f}MB "
+              f"(pool workers {result['peak_child_rss_mb']:.0f}MB)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, threshold=args.threshold)
+        if regressions:
+            print("Regressions against the baseline:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
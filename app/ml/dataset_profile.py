@@ -0,0 +1,103 @@
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+
+# Maximum decimal places probed; beyond this a float64 no longer holds exact decimals
+MAX_DECIMAL_PLACES = 17
+
+# ================= COLUMN / DATASET PROFILES ======================================
+@dataclass
+class ColumnProfile:
+    name: str
+    dtype: object
+    is_numeric: bool
+    n_rows: int
+    n_missing: int
+    n_unique: int
+    min: object = None
+    max: object = None
+    is_integer: bool = False
+    decimal_places: int = 0
+    hist: np.ndarray = None
+    bin_edges: np.ndarray = None
+
+    @property
+    def nan_rate(self):
+        return self.n_missing / self.n_rows if self.n_rows else 0.0
+
+    @property
+    def n_valid(self):
+        return self.n_rows - self.n_missing
+
+
+@dataclass
+class DatasetProfile:
+    n_rows: int
+    bins: int
+    columns: dict = field(default_factory=dict)
+    correlation: pd.DataFrame = None
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __contains__(self, column):
+        return column in self.columns
+# ========================================================================
+
+# ================= BUILD PROFILE ======================================
+def _decimal_places(values):
+    """Smallest number of decimals that represents every value exactly (no string conversion)."""
+    remaining = values
+    for places in range(MAX_DECIMAL_PLACES + 1):
+        remaining = remaining[np.round(remaining, places) != remaining]
+        if remaining.size == 0:
+            return places
+    return MAX_DECIMAL_PLACES
+
+
+def profile_dataset(data, bins=50):
+    """Collects the per-column statistics every stage needs in one pass over `data`.
+
+    Missing counts, unique counts and min/max come from whole-frame reductions;
+    integer-ness, decimal precision and the histogram are computed once per
+    numeric column on its non-null values.
+    """
+    n_rows = len(data)
+    n_missing = data.isna().sum()
+    n_unique = data.nunique()
+    numeric_cols = [col for col in data.columns if pd.api.types.is_numeric_dtype(data[col])]
+    minimums = data[numeric_cols].min() if numeric_cols else pd.Series(dtype=float)
+    maximums = data[numeric_cols].max() if numeric_cols else pd.Series(dtype=float)
+
+    profile = DatasetProfile(n_rows=n_rows, bins=bins)
+    for col in data.columns:
+        column = ColumnProfile(
+            name=col, dtype=data[col].dtype, is_numeric=col in minimums.index,
+            n_rows=n_rows, n_missing=int(n_missing[col]), n_unique=int(n_unique[col]),
+        )
+        if column.is_numeric:
+            column.min, column.max = minimums[col], maximums[col]
+
+        if column.is_numeric and data[col].dtype != 'bool':
+            values = data[col].dropna().to_numpy(dtype=float)
+            finite = values[np.isfinite(values)]
+            if pd.api.types.is_integer_dtype(data[col]):
+                column.is_integer = True
+            else:
+                column.is_integer = finite.size == values.size and bool(np.all(np.mod(finite, 1) == 0))
+                if not column.is_integer:
+                    column.decimal_places = _decimal_places(finite)
+            if finite.size:
+                column.hist, column.bin_edges = np.histogram(finite, bins=bins)
+        profile.columns[col] = column
+    return profile
+
+
+def profile_correlation(profile, data, max_rows=50_000, seed=0):
+    """Pearson correlation of `data`'s columns, computed once on a row sample and kept on the profile."""
+    columns = list(data.columns)
+    if profile.correlation is None or list(profile.correlation.columns) != columns:
+        sample = data.sample(n=max_rows, random_state=seed) if len(data) > max_rows else data
+        profile.correlation = sample.corr()
+    return profile.correlation
+# ========================================================================
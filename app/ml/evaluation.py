@@ -0,0 +1,370 @@
+import os
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+
+# ================= METRICS OBJECT ======================================
+@dataclass
+class EvaluationMetrics:
+    """Quality metrics comparing a synthetic table with the real one.
+
+    `ks` maps continuous columns to {"KS statistic", "p-value"} (the shape the
+    pipeline has always returned), `wasserstein` to the 1-Wasserstein distance,
+    and `total_variation` maps discrete columns to the TV distance between
+    their value frequencies.
+    """
+    n_real: int = 0
+    n_synthetic: int = 0
+    sampled: bool = False
+    ks: dict = field(default_factory=dict)
+    wasserstein: dict = field(default_factory=dict)
+    total_variation: dict = field(default_factory=dict)
+    correlation: dict = None
+
+    def to_dict(self):
+        return {
+            'n_real': self.n_real, 'n_synthetic': self.n_synthetic, 'sampled': self.sampled,
+            'ks': self.ks, 'wasserstein': self.wasserstein,
+            'total_variation': self.total_variation, 'correlation': self.correlation,
+        }
+# ========================================================================
+
+# ================= SUBSAMPLING ======================================
+def stratified_subsample(df, max_rows, strata=None, seed=0):
+    """Returns at most ~`max_rows` rows, sampled proportionally within each `strata` value."""
+    if max_rows is None or len(df) <= max_rows:
+        return df
+    if strata is None or strata not in df.columns:
+        return df.sample(n=max_rows, random_state=seed)
+    return df.groupby(strata, group_keys=False, dropna=False).sample(
+        frac=max_rows / len(df), random_state=seed
+    )
+
+
+def _strata_column(real_df, discrete_features):
+    # The lowest-cardinality discrete column gives well-populated strata
+    candidates = [col for col in discrete_features if col in real_df.columns]
+    if not candidates:
+        return None
+    cardinality = real_df[candidates].nunique()
+    cardinality = cardinality[cardinality > 1]
+    return cardinality.idxmin() if not cardinality.empty else None
+# ========================================================================
+
+# ================= BATCHED DISTANCES ======================================
+def _ks_p_value(statistic, n_real, n_synth):
+    # Same asymptotic approximation as ks_2samp(method='asymp')
+    from scipy.stats import kstwo
+    n_effective = np.maximum(np.round(n_real * n_synth / (n_real + n_synth)), 1)
+    return np.clip(kstwo.sf(statistic, n_effective), 0, 1)
+
+
+def distribution_distances(real, synthetic):
+    """Two-sample KS statistic, p-value and 1-Wasserstein distance for every column at once.
+
+    `real` (n x k) and `synthetic` (m x k) are float arrays; NaNs are ignored.
+    Both samples are merged and sorted column-wise in one pass, and the signed
+    ECDF difference is accumulated down the sorted order.
+    """
+    n_real = (~np.isnan(real)).sum(axis=0)
+    n_synth = (~np.isnan(synthetic)).sum(axis=0)
+
+    values = np.concatenate([real, synthetic])
+    order = np.argsort(values, axis=0, kind='stable')
+    sorted_values = np.take_along_axis(values, order, axis=0)
+    valid = ~np.isnan(sorted_values)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.where(order < len(real), 1.0 / n_real, -1.0 / n_synth) * valid
+    ecdf_diff = np.cumsum(weights, axis=0)
+
+    gaps = np.diff(sorted_values, axis=0)
+    # The ECDFs are only compared after the last copy of each tied value (NaN gaps included)
+    last_of_value = np.ones(sorted_values.shape, dtype=bool)
+    last_of_value[:-1] = gaps != 0
+    ks = np.where(last_of_value & valid, np.abs(ecdf_diff), 0).max(axis=0)
+    wasserstein = (np.abs(ecdf_diff[:-1]) * np.nan_to_num(gaps, nan=0.0)).sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_values = _ks_p_value(ks, n_real, n_synth)
+    empty = (n_real == 0) | (n_synth == 0)
+    ks, wasserstein, p_values = (np.where(empty, np.nan, arr) for arr in (ks, wasserstein, p_values))
+    return ks, p_values, wasserstein
+
+
+def value_counts(series):
+    """Value counts; Categorical columns are counted on their integer codes."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        return pd.Series(np.bincount(codes[codes >= 0], minlength=len(series.cat.categories)),
+                         index=series.cat.categories)
+    return series.value_counts()
+
+
+def total_variation(real, synthetic):
+    real_freq = value_counts(real)
+    synth_freq = value_counts(synthetic)
+    real_freq, synth_freq = real_freq / max(real_freq.sum(), 1), synth_freq / max(synth_freq.sum(), 1)
+    real_freq, synth_freq = real_freq.align(synth_freq, fill_value=0)
+    return 0.5 * float(np.abs(real_freq - synth_freq).sum())
+# ========================================================================
+
+# ================= EVALUATE ======================================
+def evaluate_metrics(real_df, synthetic_df, discrete_features=None, max_rows=None, seed=0):
+    """Computes KS, Wasserstein, total variation and correlation differences.
+
+    With `max_rows`, both tables are first stratified-subsampled (by their
+    lowest-cardinality discrete column), so the cost stays flat however many
+    rows were generated.
+    """
+    discrete_features = list(discrete_features or [])
+    strata = _strata_column(real_df, discrete_features)
+    real_sample = stratified_subsample(real_df, max_rows, strata, seed)
+    synth_sample = stratified_subsample(synthetic_df, max_rows, strata, seed)
+
+    metrics = EvaluationMetrics(
+        n_real=len(real_df), n_synthetic=len(synthetic_df),
+        sampled=len(real_sample) < len(real_df) or len(synth_sample) < len(synthetic_df),
+    )
+
+    numeric_cols = [col for col in real_df.columns if pd.api.types.is_numeric_dtype(real_df[col])]
+    continuous_cols = [col for col in numeric_cols
+                       if col not in discrete_features and col in synthetic_df.columns]
+    if continuous_cols:
+        ks, p_values, wasserstein = distribution_distances(
+            real_sample[continuous_cols].to_numpy(dtype=float),
+            synth_sample[continuous_cols].to_numpy(dtype=float),
+        )
+        for i, col in enumerate(continuous_cols):
+            metrics.ks[col] = {"KS statistic": float(ks[i]), "p-value": float(p_values[i])}
+            metrics.wasserstein[col] = float(wasserstein[i])
+
+    for col in discrete_features:
+        if col in real_df.columns and col in synthetic_df.columns:
+            metrics.total_variation[col] = total_variation(real_sample[col], synth_sample[col])
+
+    if numeric_cols:
+        real_corr = real_sample[numeric_cols].corr()
+        synth_corr = synth_sample[numeric_cols].corr()
+        corr_diff = np.abs(real_corr - synth_corr)
+        metrics.correlation = {
+            'max_diff': float(corr_diff.max().max()),
+            'avg_diff': float(corr_diff.mean().mean()),
+        }
+    return metrics
+# ========================================================================
+
+# ================= STREAMING METRICS ======================================
+def init_stream_metrics(real_df, discrete_features, bins=1000):
+    """Precomputes the real-data side of the metrics accumulated by `update_stream_metrics`.
+
+    KS and Wasserstein are evaluated on a fixed grid of `bins` edges spanning
+    each continuous column's range, so only histograms (and discrete value
+    counts) have to be kept per chunk. Synthetic values outside the real range
+    are counted in an extra bin on either side, together with their distance
+    to the range.
+    """
+    discrete_features = list(discrete_features or [])
+    numeric_cols = [col for col in real_df.columns if pd.api.types.is_numeric_dtype(real_df[col])]
+    continuous_cols = [col for col in numeric_cols if col not in discrete_features]
+
+    edges, real_cdf, n_real = {}, {}, {}
+    for col in continuous_cols:
+        values = np.sort(real_df[col].dropna().to_numpy(dtype=float))
+        if len(values) == 0:
+            continue
+        edges[col] = np.linspace(values[0], values[-1], bins + 1)
+        real_cdf[col] = np.searchsorted(values, edges[col][1:], side='right') / len(values)
+        n_real[col] = len(values)
+
+    k = len(numeric_cols)
+    return {
+        'n_real': len(real_df),
+        'numeric_cols': numeric_cols,
+        'real_corr': real_df[numeric_cols].corr() if numeric_cols else None,
+        'edges': edges,
+        'real_cdf': real_cdf,
+        'n_real_valid': n_real,
+        # [below, bin 1, ..., bin n, above]
+        'hist': {col: np.zeros(bins + 2) for col in edges},
+        # Summed distance of the values below and above the real range
+        'tails': {col: np.zeros(2) for col in edges},
+        'real_freq': {col: real_df[col].value_counts(normalize=True) for col in discrete_features
+                      if col in real_df.columns},
+        'synth_counts': {col: pd.Series(dtype=float) for col in discrete_features if col in real_df.columns},
+        'n_rows': 0,
+        'n_complete': 0,
+        'mean': np.zeros(k),
+        'comoment': np.zeros((k, k)),
+    }
+
+
+def update_stream_metrics(metrics, chunk):
+    metrics['n_rows'] += len(chunk)
+    for col, edges in metrics['edges'].items():
+        values = chunk[col].dropna().to_numpy(dtype=float)
+        below, above = values < edges[0], values > edges[-1]
+        # Bin i + 1 holds edges[i] <= x < edges[i + 1]; the last bin also holds edges[-1]
+        index = np.searchsorted(edges[1:-1], values, side='right') + 1
+        index[below], index[above] = 0, len(edges)
+        metrics['hist'][col] += np.bincount(index, minlength=len(edges) + 1)
+        metrics['tails'][col] += [(edges[0] - values[below]).sum(), (values[above] - edges[-1]).sum()]
+
+    for col in metrics['synth_counts']:
+        metrics['synth_counts'][col] = metrics['synth_counts'][col].add(
+            value_counts(chunk[col]), fill_value=0
+        )
+
+    if metrics['numeric_cols']:
+        values = chunk[metrics['numeric_cols']].dropna().to_numpy(dtype=float)
+        if len(values):
+            # Chunk moments are merged pairwise (Chan et al.), which stays accurate for large means
+            n_a, n_b = metrics['n_complete'], len(values)
+            chunk_mean = values.mean(axis=0)
+            centered = values - chunk_mean
+            delta = chunk_mean - metrics['mean']
+            metrics['comoment'] += centered.T @ centered + np.outer(delta, delta) * n_a * n_b / (n_a + n_b)
+            metrics['mean'] += delta * n_b / (n_a + n_b)
+            metrics['n_complete'] = n_a + n_b
+    return metrics
+
+
+def finalize_stream_metrics(metrics):
+    """Turns the accumulated histograms, counts and sums into an `EvaluationMetrics`."""
+    result = EvaluationMetrics(n_real=metrics['n_real'], n_synthetic=metrics['n_rows'])
+
+    for col, hist in metrics['hist'].items():
+        n_synth = hist.sum()
+        if n_synth == 0:
+            continue
+        # Synthetic CDF at edges[1:], which includes the mass below the real range;
+        # the real CDF is 0 just below edges[0] and 1 from edges[-1] on
+        cdf_diff = np.abs(np.cumsum(hist[:-1])[1:] / n_synth - metrics['real_cdf'][col])
+        statistic = max(cdf_diff.max(), hist[0] / n_synth)
+        n_real = metrics['n_real_valid'][col]
+        p_value = _ks_p_value(statistic, n_real, n_synth)
+        result.ks[col] = {"KS statistic": float(statistic), "p-value": float(p_value)}
+        result.wasserstein[col] = float(
+            (cdf_diff * np.diff(metrics['edges'][col])).sum() + metrics['tails'][col].sum() / n_synth
+        )
+
+    for col, counts in metrics['synth_counts'].items():
+        if counts.sum() > 0:
+            synth_freq, real_freq = (counts / counts.sum()).align(metrics['real_freq'][col], fill_value=0)
+            result.total_variation[col] = 0.5 * float(np.abs(real_freq - synth_freq).sum())
+
+    n = metrics['n_complete']
+    if metrics['numeric_cols'] and n > 1:
+        cov = metrics['comoment'] / (n - 1)
+        std = np.sqrt(np.diag(cov))
+        # Constant columns have no correlation (NaN), as in DataFrame.corr
+        std = np.where(std > 1e-12 * np.maximum(np.abs(metrics['mean']), 1), std, np.nan)
+        synth_corr = cov / np.outer(std, std)
+        corr_diff = np.abs(metrics['real_corr'].to_numpy() - synth_corr)
+        if not np.isnan(corr_diff).all():
+            result.correlation = {'max_diff': float(np.nanmax(corr_diff)),
+                                  'avg_diff': float(np.nanmean(corr_diff))}
+    return result
+# ========================================================================
+
+# ================= PLOTS ======================================
+def render_evaluation_plots(real_df, synthetic_df, discrete_features=None, public_dir=None,
+                            max_rows=10_000, seed=0):
+    """Draws the distribution and correlation figures into `public_dir`.
+
+    This is a separate, opt-in step; KDEs are fitted on at most `max_rows` rows
+    per table. The plotting libraries are only imported here, so metrics-only
+    runs never pay for them.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    discrete_features = list(discrete_features or [])
+    strata = _strata_column(real_df, discrete_features)
+    real_df = stratified_subsample(real_df, max_rows, strata, seed)
+    synthetic_df = stratified_subsample(synthetic_df, max_rows, strata, seed)
+
+    features = real_df.columns
+    num_features = len(features)
+    ncols = 3
+    nrows = (num_features + ncols - 1) // ncols
+
+    plt.figure(figsize=(ncols * 8, nrows * 6))
+    for idx, feature in enumerate(features):
+        plt.subplot(nrows, ncols, idx + 1)
+
+        is_discrete = (discrete_features and feature in discrete_features) or \
+                      not pd.api.types.is_numeric_dtype(real_df[feature])
+
+        if is_discrete:
+            real_counts = real_df[feature].value_counts(normalize=True).nlargest(10)
+            synth_counts = synthetic_df[feature].value_counts(normalize=True)
+
+            top_values = list(real_counts.index)
+            x = np.arange(len(top_values))
+            width = 0.35
+
+            plt.bar(x - width / 2,
+                    [real_counts.get(idx, 0) for idx in top_values],
+                    width, label='Original', alpha=0.7)
+            plt.bar(x + width / 2,
+                    [synth_counts.get(idx, 0) for idx in top_values],
+                    width, label='Synthetic', alpha=0.7)
+
+            plt.xticks(x, top_values, rotation=45, ha='right')
+            plt.title(f'Top Values for {feature}', fontsize=14)
+        else:
+            try:
+                sns.kdeplot(data=real_df, x=feature, label='Original',
+                            color='blue', fill=True, alpha=0.5)
+                sns.kdeplot(data=synthetic_df, x=feature, label='Synthetic',
+                            color='orange', fill=True, alpha=0.5)
+                plt.title(f'KDE of {feature}', fontsize=14)
+            except (TypeError, ValueError) as e:
+                plt.text(0.5, 0.5, f"Cannot plot {feature}: {str(e)}",
+                         ha='center', va='center', transform=plt.gca().transAxes)
+                plt.axis('off')
+
+        plt.legend(fontsize=12)
+        plt.grid(False)
+
+    plt.tight_layout()
+    if public_dir:
+        plt.savefig(os.path.join(public_dir, 'distributions.png'), dpi=300, bbox_inches='tight', pad_inches=0.2)
+    plt.close()
+
+    numeric_cols = [col for col in real_df.columns if pd.api.types.is_numeric_dtype(real_df[col])]
+    if not numeric_cols:
+        return
+    if len(numeric_cols) >= 7:
+        print(f"Skipping correlation plot for {len(numeric_cols)} columns (too many)")
+        return
+
+    real_corr = real_df[numeric_cols].corr()
+    synth_corr = synthetic_df[numeric_cols].corr()
+    corr_diff = np.abs(real_corr - synth_corr)
+    max_diff = corr_diff.max().max()
+    avg_diff = corr_diff.mean().mean()
+
+    plt.figure(figsize=(18, 6))
+    plt.suptitle(f"Max Difference: {max_diff:.4f}, Average Difference: {avg_diff:.4f}", fontsize=16, y=1.02)
+
+    plt.subplot(131)
+    sns.heatmap(real_corr, annot=False, cmap='coolwarm', cbar=True)
+    plt.title('Original Data Correlation', fontsize=14)
+
+    plt.subplot(132)
+    sns.heatmap(synth_corr, annot=False, cmap='coolwarm', cbar=True)
+    plt.title('Synthetic Data Correlation', fontsize=14)
+
+    plt.subplot(133)
+    sns.heatmap(corr_diff, annot=False, cmap='viridis', cbar=True)
+    plt.title('Absolute Correlation Difference', fontsize=14)
+
+    plt.tight_layout()
+    if public_dir:
+        plt.savefig(os.path.join(public_dir, 'correlation_matrix.png'), dpi=300, bbox_inches='tight', pad_inches=0.2)
+    plt.close()
+# ========================================================================
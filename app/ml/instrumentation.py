@@ -0,0 +1,97 @@
+import sys
+import json
+import time
+import resource
+from contextlib import contextmanager
+
+# ================= EVENT SINK ======================================
+# Callable receiving every event dict; None disables instrumentation
+_sink = None
+
+
+def set_event_sink(sink):
+    """Routes events to `sink(event)` (None turns events off) and returns the previous sink."""
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+@contextmanager
+def event_sink(sink):
+    previous = set_event_sink(sink)
+    try:
+        yield
+    finally:
+        set_event_sink(previous)
+
+
+def json_lines_sink(stream):
+    """A sink writing one JSON object per line to `stream`."""
+    def write(event):
+        stream.write(json.dumps(event, default=_json_default) + '\n')
+        stream.flush()
+    return write
+
+
+def _json_default(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+# ========================================================================
+
+# ================= EVENTS ======================================
+def peak_rss_mb():
+    """Memory high-water mark of this process and of its finished children, in MB."""
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    scale = 1 / 1024 if sys.platform != 'darwin' else 1 / (1024 * 1024)
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return own, children
+
+
+def emit(event, **fields):
+    """Sends one event, stamped with the wall-clock time, to the current sink."""
+    if _sink is None:
+        return
+    _sink(dict(fields, event=event, time=time.time()))
+
+
+@contextmanager
+def stage(name, **info):
+    """Emits stage_start/stage_end around a block.
+
+    The block may add fields (e.g. rows processed) to the yielded dict, which
+    are sent with stage_end along with the wall time and memory high-water mark.
+    """
+    record = {}
+    emit('stage_start', stage=name, **info)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        own, children = peak_rss_mb()
+        emit('stage_end', stage=name, seconds=time.perf_counter() - start,
+             peak_rss_mb=own, peak_child_rss_mb=children, **dict(info, **record))
+# ========================================================================
+
+# ================= PROFILING ======================================
+@contextmanager
+def profiled(output_path=None, top=25):
+    """Runs the block under cProfile and prints the `top` entries by cumulative time.
+
+    With `output_path` the raw stats are also dumped there, for snakeviz,
+    gprof2dot or `python -m pstats`.
+    """
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if output_path:
+            profiler.dump_stats(output_path)
+            print(f"Profile written to: {output_path}")
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(top)
+# ========================================================================
@@ -0,0 +1,162 @@
+import os
+import json
+import pickle
+import hashlib
+from importlib.metadata import version
+
+# Checked instead of importing sklearn, which is slow to import
+SKLEARN_VERSION = version('scikit-learn')
+
+# Bump whenever the layout or contents of the dict returned by `fit_synthetic_model` change,
+# so stale artifacts are refitted instead of being unpickled into the new code.
+ARTIFACT_VERSION = 6
+
+# ================= ARTIFACT KEYS ======================================
+def input_fingerprint(path, params=None, chunk_size=1 << 20):
+    """Content hash of the input file combined with the fit parameters."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    digest.update(f"v{ARTIFACT_VERSION}".encode())
+    return digest.hexdigest()
+
+
+def input_alias(path, params=None):
+    """Key naming the latest model fitted on the file at `path`, whatever its content."""
+    digest = hashlib.sha256(os.path.abspath(path).encode())
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    digest.update(f"v{ARTIFACT_VERSION}".encode())
+    return digest.hexdigest()
+
+
+def default_cache_dir(input_path):
+    return os.path.join(os.path.dirname(os.path.abspath(input_path)), '.model_cache')
+# ========================================================================
+
+# ================= LOAD / SAVE ARTIFACTS ======================================
+def _artifact_path(cache_dir, key):
+    return os.path.join(cache_dir, f'{key}.pkl')
+
+
+def load_artifact(cache_dir, key):
+    """Returns the fitted model stored under `key`, or None on a miss.
+
+    Artifacts written by another artifact version or scikit-learn release are
+    treated as misses. A hit refreshes the file's mtime, which drives LRU eviction.
+    """
+    path = _artifact_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            artifact = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        print(f"Warning: Ignoring unreadable model artifact {path}: {e}")
+        return None
+
+    if artifact.get('version') != ARTIFACT_VERSION or artifact.get('sklearn') != SKLEARN_VERSION:
+        return None
+
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return artifact['model']
+
+
+def save_artifact(model, cache_dir, key, max_entries=8, max_bytes=None):
+    """Writes `model` under `key` and evicts least recently used artifacts."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _artifact_path(cache_dir, key)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    artifact = {'version': ARTIFACT_VERSION, 'sklearn': SKLEARN_VERSION, 'key': key, 'model': model}
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    evict_artifacts(cache_dir, max_entries=max_entries, max_bytes=max_bytes, keep=path)
+    return path
+
+
+def save_latest(cache_dir, alias, key, max_entries=8):
+    """Points `alias` at the artifact stored under `key` and evicts stale aliases."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'{alias}.latest')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'key': key}, f)
+    os.replace(tmp_path, path)
+    _evict_aliases(cache_dir, max_entries)
+
+
+def load_latest(cache_dir, alias):
+    """Returns the model `alias` points at, or None when there is none or it was evicted."""
+    try:
+        with open(os.path.join(cache_dir, f'{alias}.latest')) as f:
+            key = json.load(f)['key']
+    except (OSError, ValueError, KeyError):
+        return None
+    return load_artifact(cache_dir, key)
+
+
+def evict_artifacts(cache_dir, max_entries=8, max_bytes=None, keep=None):
+    """Deletes the oldest artifacts until the cache fits within the given bounds.
+
+    Aliases pointing at an evicted artifact are deleted with it, and at most
+    `max_entries` of the most recently written aliases are kept.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.pkl'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # Evicted concurrently by another process sharing the cache
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort(reverse=True)
+
+    total_bytes = sum(size for _, size, _ in entries)
+    while entries and (len(entries) > max_entries or (max_bytes is not None and total_bytes > max_bytes)):
+        _, size, path = entries.pop()
+        if path == keep:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+    _evict_aliases(cache_dir, max_entries)
+
+
+def _evict_aliases(cache_dir, max_entries):
+    aliases = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.latest'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            aliases.append((os.stat(path).st_mtime, path))
+        except FileNotFoundError:
+            continue
+    aliases.sort(reverse=True)
+
+    for i, (_, path) in enumerate(aliases):
+        if i < max_entries:
+            try:
+                with open(path) as f:
+                    key = json.load(f)['key']
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError):
+                key = None
+            if key is not None and os.path.exists(_artifact_path(cache_dir, key)):
+                continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+# ========================================================================
@@ -0,0 +1,126 @@
+import os
+from contextlib import contextmanager
+from importlib.util import find_spec
+import numpy as np
+import pandas as pd
+
+FORMAT_EXTENSIONS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'arrow': '.arrow',
+}
+_EXTENSION_FORMATS = {
+    '.csv': 'csv', '.txt': 'csv',
+    '.parquet': 'parquet', '.pq': 'parquet',
+    '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow',
+}
+
+# ================= FORMATS ======================================
+def table_format(path):
+    """'csv', 'parquet' or 'arrow' (Arrow IPC / Feather v2), from the file extension."""
+    _, ext = os.path.splitext(path)
+    return _EXTENSION_FORMATS.get(ext.lower(), 'csv')
+
+
+def is_typed_format(fmt):
+    # Typed formats store dtypes, so values need no text-formatting pass
+    return fmt in ('parquet', 'arrow')
+
+
+def output_path_for(input_path, public_dir, fmt=None):
+    name, _ = os.path.splitext(os.path.basename(input_path))
+    fmt = fmt or table_format(input_path)
+    return os.path.join(public_dir, f'{name}_SYNTHETIC{FORMAT_EXTENSIONS[fmt]}')
+# ========================================================================
+
+# ================= READING ======================================
+def read_table(path, columns=None, nrows=None):
+    """Reads a CSV, Parquet or Arrow IPC file into a DataFrame.
+
+    `columns` projects the read onto a subset of columns, so unused columns are
+    never parsed. Parquet and Arrow files are memory-mapped. CSV files are
+    parsed by the multithreaded pyarrow reader when it is installed.
+    """
+    fmt = table_format(path)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        if nrows is not None:
+            parquet_file = pq.ParquetFile(path, memory_map=True)
+            batch = next(parquet_file.iter_batches(batch_size=nrows, columns=columns), None)
+            if batch is None:
+                return parquet_file.schema_arrow.empty_table().to_pandas()
+            return batch.to_pandas()
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+    if fmt == 'arrow':
+        import pyarrow.feather as feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        if nrows is not None:
+            table = table.slice(0, nrows)
+        return table.to_pandas()
+
+    # The pyarrow engine has no `nrows`; short previews use the C parser
+    if nrows is None and find_spec('pyarrow') is not None:
+        return pd.read_csv(path, usecols=columns, engine='pyarrow')
+    return pd.read_csv(path, usecols=columns, nrows=nrows)
+# ========================================================================
+
+# ================= WRITING ======================================
+def restore_dtypes(df, dtypes):
+    """Casts sampled columns back to the input dtypes (integers are rounded first)."""
+    for col, dtype in dtypes.items():
+        if col not in df.columns or df[col].dtype == dtype:
+            continue
+        if pd.api.types.is_integer_dtype(dtype) and pd.api.types.is_float_dtype(df[col].dtype):
+            values = np.rint(df[col])
+            # NumPy integers cannot hold missing values; fall back to the nullable type
+            if values.isna().any() and not isinstance(dtype, pd.api.extensions.ExtensionDtype):
+                dtype = pd.Int64Dtype()
+            df[col] = values.astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+@contextmanager
+def open_table_writer(path, fmt=None):
+    """Yields a write(chunk) function that appends DataFrame chunks to one output file.
+
+    The first chunk fixes the schema of Parquet and Arrow outputs.
+    """
+    fmt = fmt or table_format(path)
+    if fmt == 'csv':
+        with open(path, 'w', newline='') as f:
+            state = {'header': True}
+
+            def write(chunk):
+                chunk.to_csv(f, header=state['header'], index=False)
+                state['header'] = False
+            yield write
+        return
+
+    import pyarrow as pa
+    state = {'writer': None, 'schema': None}
+
+    def write(chunk):
+        table = pa.Table.from_pandas(chunk, schema=state['schema'], preserve_index=False)
+        if state['writer'] is None:
+            state['schema'] = table.schema
+            if fmt == 'parquet':
+                import pyarrow.parquet as pq
+                state['writer'] = pq.ParquetWriter(path, table.schema)
+            else:
+                state['writer'] = pa.ipc.new_file(path, table.schema)
+        state['writer'].write_table(table)
+
+    try:
+        yield write
+    finally:
+        if state['writer'] is not None:
+            state['writer'].close()
+
+
+def write_table(df, path, fmt=None):
+    with open_table_writer(path, fmt) as write:
+        write(df)
+# ========================================================================
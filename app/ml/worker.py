@@ -0,0 +1,357 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import GMM_Model
+import instrumentation
+
+# GMM_Model imports these lazily; the long-lived worker loads them once up front
+# so forked job processes inherit them instead of importing them per job
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot
+import seaborn
+import sklearn.mixture
+import sklearn.cluster
+
+# Instrumentation events kept per job (oldest are dropped first)
+MAX_JOB_EVENTS = 2000
+
+VISUALIZATION_FILES = {
+    'distributions': 'distributions.png',
+    'correlations': 'correlation_matrix.png',
+    'bic_aic': 'bic_aic_plot.png',
+}
+
+# ================= JOB PROCESSES ======================================
+_events = None
+
+
+def _init_job_process(events):
+    global _events
+    _events = events
+
+
+def _warm_job_process(_):
+    time.sleep(0.1)
+
+
+def _jsonable(value):
+    if hasattr(value, 'to_dict'):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def _run_job(job_id, input_path, n_samples, output_dir, options):
+    # Every instrumentation event (progress updates included) goes to the manager
+    with instrumentation.event_sink(lambda event: _events.put((job_id, _jsonable(event)))):
+        output_path, quality_metrics = GMM_Model.run_generation(
+            input_path, n_samples, output_dir, **options
+        )
+    return os.path.basename(output_path), _jsonable(quality_metrics)
+
+
+def _render_job(job_id, input_path, output_dir, output_name):
+    with instrumentation.event_sink(lambda event: _events.put((job_id, _jsonable(event)))):
+        with instrumentation.stage('render_plots'):
+            GMM_Model.render_visualizations(input_path, output_dir, os.path.join(output_dir, output_name))
+# ========================================================================
+
+# ================= JOB MANAGER ======================================
+class JobManager:
+    """Queues generation jobs onto a pool of pre-forked processes and tracks their status.
+
+    Every job gets its own upload directory (removed once the job finishes) and
+    output directory under `output_dir`, so concurrent jobs never share files.
+    Fitted models are shared through one model cache. With `defer_plots`, a job
+    is reported done as soon as its data is written and the figures are rendered
+    by a follow-up job in the same pool.
+    """
+
+    def __init__(self, uploads_dir, output_dir, concurrency=2, keep_jobs=50, options=None,
+                 defer_plots=False):
+        self.uploads_dir = uploads_dir
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.keep_jobs = keep_jobs
+        self.options = options or {}
+        self.defer_plots = defer_plots
+        self.jobs = {}
+        self.job_events = {}
+        self.lock = threading.Lock()
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        self.events = context.Queue()
+        self.pool = ProcessPoolExecutor(max_workers=concurrency, mp_context=context,
+                                        initializer=_init_job_process, initargs=(self.events,))
+        # Start every job process now, before any server threads exist
+        list(self.pool.map(_warm_job_process, range(concurrency)))
+        threading.Thread(target=self._consume_events, daemon=True).start()
+
+    def submit(self, filename, body, n_samples, sample_only=False):
+        job_id = uuid.uuid4().hex
+        upload_dir = os.path.join(self.uploads_dir, job_id)
+        job_output_dir = os.path.join(self.output_dir, job_id)
+        os.makedirs(upload_dir, exist_ok=True)
+        os.makedirs(job_output_dir, exist_ok=True)
+
+        input_path = os.path.join(upload_dir, os.path.basename(filename) or 'dataset.csv')
+        with open(input_path, 'wb') as f:
+            f.write(body)
+
+        job = {
+            'id': job_id, 'status': 'queued', 'stage': None, 'progress': {},
+            'samples': n_samples, 'created': time.time(), 'started': None, 'finished': None,
+            'output': None, 'visualizations': {}, 'visualizations_status': None,
+            'quality_metrics': None, 'error': None, 'timings': {}, 'peak_rss_mb': None,
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+            self.job_events[job_id] = {'offset': 0, 'events': []}
+
+        options = dict(self.options, sample_only=sample_only, plots=not self.defer_plots)
+        future = self.pool.submit(_run_job, job_id, input_path, n_samples, job_output_dir, options)
+        future.add_done_callback(lambda f: self._finish(job_id, f, input_path, job_output_dir))
+        return self.get(job_id)
+
+    def _consume_events(self):
+        while True:
+            job_id, event = self.events.get()
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    continue
+                log = self.job_events[job_id]
+                log['events'].append(event)
+                if len(log['events']) > MAX_JOB_EVENTS:
+                    del log['events'][0]
+                    log['offset'] += 1
+
+                if event['event'] == 'stage_end':
+                    job['timings'][event['stage']] = event['seconds']
+                    job['peak_rss_mb'] = max(job['peak_rss_mb'] or 0, event['peak_rss_mb'])
+                if job['status'] in ('done', 'failed'):
+                    continue
+                if job['status'] == 'queued':
+                    job['status'], job['started'] = 'running', time.time()
+                if event['event'] == 'progress':
+                    info = {k: v for k, v in event.items() if k not in ('event', 'stage', 'time')}
+                    job['stage'] = event['stage']
+                    job['progress'] = info
+
+    def _finish(self, job_id, future, input_path, job_output_dir):
+        upload_dir = os.path.dirname(input_path)
+        error = future.exception()
+        render = error is None and self.defer_plots and future.result()[1] is not None
+        with self.lock:
+            job = self.jobs[job_id]
+            job['finished'] = time.time()
+            if error is not None:
+                job['status'], job['error'] = 'failed', str(error)
+            else:
+                job['status'], job['stage'] = 'done', 'done'
+                job['output'], job['quality_metrics'] = future.result()
+                if render:
+                    job['visualizations_status'] = 'pending'
+                else:
+                    self._collect_visualizations(job, job_output_dir)
+
+        if render:
+            render_future = self.pool.submit(_render_job, job_id, input_path, job_output_dir, job['output'])
+            render_future.add_done_callback(
+                lambda f: self._finish_render(job_id, f, upload_dir, job_output_dir)
+            )
+        else:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            self._prune()
+
+    def _finish_render(self, job_id, future, upload_dir, job_output_dir):
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        with self.lock:
+            job = self.jobs[job_id]
+            if future.exception() is not None:
+                job['visualizations_status'] = 'failed'
+            else:
+                self._collect_visualizations(job, job_output_dir)
+        self._prune()
+
+    def _collect_visualizations(self, job, job_output_dir):
+        job['visualizations_status'] = 'done'
+        job['visualizations'] = {
+            key: name for key, name in VISUALIZATION_FILES.items()
+            if os.path.exists(os.path.join(job_output_dir, name))
+        }
+
+    def _prune(self):
+        # Drop the oldest finished jobs (and their outputs) beyond `keep_jobs`
+        with self.lock:
+            finished = sorted((job for job in self.jobs.values()
+                               if job['finished'] and job['visualizations_status'] != 'pending'),
+                              key=lambda job: job['finished'])
+            expired = finished[:max(0, len(finished) - self.keep_jobs)]
+            for job in expired:
+                del self.jobs[job['id']]
+                del self.job_events[job['id']]
+        for job in expired:
+            shutil.rmtree(os.path.join(self.output_dir, job['id']), ignore_errors=True)
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def events_since(self, job_id, since=0):
+        """Events of a job from index `since` on, and the index to poll from next."""
+        with self.lock:
+            log = self.job_events.get(job_id)
+            if log is None:
+                return None
+            start = max(since - log['offset'], 0)
+            events = log['events'][start:]
+            return events, log['offset'] + len(log['events'])
+
+    def list(self):
+        with self.lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def stats(self):
+        with self.lock:
+            statuses = [job['status'] for job in self.jobs.values()]
+        return {
+            'status': 'ok', 'concurrency': self.concurrency,
+            'queued': statuses.count('queued'), 'running': statuses.count('running'),
+        }
+# ========================================================================
+
+# ================= HTTP API ======================================
+class WorkerHandler(BaseHTTPRequestHandler):
+    manager = None
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = [part for part in urlparse(self.path).path.split('/') if part]
+        if parts == ['health']:
+            self._send_json(self.manager.stats())
+        elif parts == ['jobs']:
+            self._send_json({'jobs': self.manager.list()})
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+            try:
+                since = int(parse_qs(urlparse(self.path).query).get('since', ['0'])[0])
+            except ValueError:
+                since = 0
+            result = self.manager.events_since(parts[1], since)
+            if result is None:
+                self._send_json({'error': f'Unknown job: {parts[1]}'}, status=404)
+            else:
+                events, next_index = result
+                self._send_json({'events': events, 'next': next_index})
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self.manager.get(parts[1])
+            if job is None:
+                self._send_json({'error': f'Unknown job: {parts[1]}'}, status=404)
+            else:
+                self._send_json(job)
+        else:
+            self._send_json({'error': 'Not found'}, status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            self._send_json({'error': 'Not found'}, status=404)
+            return
+
+        query = parse_qs(url.query)
+        try:
+            n_samples = int(query.get('samples', [''])[0])
+            if n_samples <= 0:
+                raise ValueError
+        except ValueError:
+            self._send_json({'error': 'Invalid number of samples'}, status=400)
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length == 0:
+            self._send_json({'error': 'No valid file uploaded'}, status=400)
+            return
+
+        job = self.manager.submit(
+            query.get('filename', ['dataset.csv'])[0], self.rfile.read(length), n_samples,
+            sample_only=query.get('sample_only', ['0'])[0] in ('1', 'true'),
+        )
+        self._send_json(job, status=202)
+
+    def log_message(self, format, *args):
+        pass
+# ========================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Long-lived synthetic data generation worker')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('GMM_WORKER_PORT', 8765)))
+    parser.add_argument('--uploads_dir', type=str, default=os.path.join('uploads', 'jobs'),
+                        help='Directory for per-job input files')
+    parser.add_argument('--output_dir', type=str, default=os.path.join('uploads', 'outputs'),
+                        help='Directory for per-job synthetic data and visualizations')
+    parser.add_argument('--cache_dir', type=str, default=os.path.join('uploads', '.model_cache'),
+                        help='Model artifact cache shared by all jobs')
+    parser.add_argument('--concurrency', type=int, default=2, help='Number of jobs run at the same time')
+    parser.add_argument('--keep_jobs', type=int, default=50, help='Finished jobs whose outputs are kept')
+    parser.add_argument('--model_type', choices=['gmm', 'block_gmm', 'cluster_gmm'], default='gmm')
+    parser.add_argument('--max_components', type=int, default=10)
+    parser.add_argument('--patience', type=int, default=3)
+    parser.add_argument('--fit_rows', type=int, default=50_000,
+                        help='Starting subsample size for fitting large inputs (0 fits on every row)')
+    parser.add_argument('--batch_size', type=int, default=100_000)
+    parser.add_argument('--defer_plots', action='store_true',
+                        help='Report jobs done once data is written and render figures in a follow-up job')
+    args = parser.parse_args()
+
+    options = {
+        'model_type': args.model_type,
+        'max_components': args.max_components,
+        'patience': args.patience or None,
+        'fit_rows': args.fit_rows or None,
+        'batch_size': args.batch_size,
+        'cache_dir': args.cache_dir,
+        # Share the cores between concurrent jobs for the BIC sweep
+        'n_jobs': max(1, (os.cpu_count() or 1) // args.concurrency),
+    }
+    WorkerHandler.manager = JobManager(args.uploads_dir, args.output_dir,
+                                       concurrency=args.concurrency, keep_jobs=args.keep_jobs,
+                                       options=options, defer_plots=args.defer_plots)
+    server = ThreadingHTTPServer((args.host, args.port), WorkerHandler)
+    print(f"Generation worker listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        WorkerHandler.manager.pool.shutdown(cancel_futures=True)
+
+if __name__ == "__main__":
+    main()
@@ -444,6 +444,7 @@ export default function Home() {
     setDataset,
     generatedData,
     setGeneratedData,
+    setGenerationJobId,
     generationMetrics,
     setGenerationMetrics,
   } = useData()
@@ -661,6 +662,7 @@ export default function Home() {
         });
 
         setGeneratedData(result.data);
+        setGenerationJobId(result.jobId);
         setGenerationStage('Generation complete!');
 
         toast.success("Synthetic data generated successfully!");
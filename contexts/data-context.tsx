@@ -10,6 +10,8 @@ interface DataContextType {
   setDataset: (dataset: Dataset | null) => void
   generatedData: string | null
   setGeneratedData: (data: string | null) => void
+  generationJobId: string | null
+  setGenerationJobId: (jobId: string | null) => void
   generationMetrics: {
     fileSize?: string
     columnMetrics?: Record<string, any>
@@ -24,6 +26,7 @@ export function DataProvider({ children }: { children: ReactNode }) {
   const [selectedFile, setSelectedFile] = useState<File | null>(null)
   const [dataset, setDataset] = useState<Dataset | null>(null)
   const [generatedData, setGeneratedData] = useState<string | null>(null)
+  const [generationJobId, setGenerationJobId] = useState<string | null>(null)
   const [generationMetrics, setGenerationMetrics] = useState<{
     fileSize?: string
     columnMetrics?: Record<string, any>
@@ -39,6 +42,8 @@ export function DataProvider({ children }: { children: ReactNode }) {
         setDataset,
         generatedData,
         setGeneratedData,
+        generationJobId,
+        setGenerationJobId,
         generationMetrics,
         setGenerationMetrics,
       }}
@@ -132,8 +132,8 @@ export const generateSyntheticData = async (file: File, numSamples: number): Pro
       body: formData,
     });
 
+    const responseData = await response.json();
     if (!response.ok) {
-      const responseData = await response.json();
       console.error('Error response from server:', responseData);
       throw new Error(
         responseData.details || 
@@ -142,8 +142,8 @@ export const generateSyntheticData = async (file: File, numSamples: number): Pro
       );
     }
 
-    // Get the synthetic data file from the public directory
-    const syntheticDataResponse = await fetch('/dataset_SYNTHETIC.csv');
+    // Get the synthetic data file of this job (served by /api/jobs/<id>/files/<name>)
+    const syntheticDataResponse = await fetch(responseData.syntheticData);
     if (!syntheticDataResponse.ok) {
       throw new Error('Failed to fetch synthetic data file');
     }
@@ -172,11 +172,8 @@ export const generateSyntheticData = async (file: File, numSamples: number): Pro
     return {
       success: true,
       data: syntheticDataBlob,
-      visualizations: {
-        distributions: '/distributions.png',
-        correlations: '/correlation_matrix.png',
-        bic_aic: '/bic_aic_plot.png'
-      }
+      jobId: responseData.jobId,
+      visualizations: responseData.visualizations
     };
   } catch (error) {
     console.error('Error in generateSyntheticData:', error);
@@ -0,0 +1,150 @@
+import { spawn } from 'child_process';
+import { existsSync } from 'fs';
+import path from 'path';
+
+const WORKER_PORT = Number(process.env.GMM_WORKER_PORT || 8765);
+const WORKER_URL = process.env.GMM_WORKER_URL || `http://127.0.0.1:${WORKER_PORT}`;
+const STARTUP_TIMEOUT_MS = 60000;
+
+// Job outputs are written at request time, so they live outside public/ and are served by /api/jobs
+export const JOB_OUTPUT_DIR = process.env.GMM_JOB_OUTPUT_DIR || path.join(process.cwd(), 'uploads', 'outputs');
+
+export interface GenerationJob {
+    id: string;
+    status: 'queued' | 'running' | 'done' | 'failed';
+    stage: string | null;
+    progress: Record<string, unknown>;
+    samples: number;
+    created: number;
+    started: number | null;
+    finished: number | null;
+    output: string | null;
+    visualizations: Record<string, string>;
+    visualizations_status: 'pending' | 'done' | 'failed' | null;
+    quality_metrics: Record<string, unknown> | null;
+    error: string | null;
+    timings: Record<string, number>;
+    peak_rss_mb: number | null;
+}
+
+// Instrumentation event emitted by the Python pipeline (stage_start, stage_end, progress, candidate, ...)
+export interface GenerationEvent {
+    event: string;
+    time: number;
+    stage?: string;
+    seconds?: number;
+    [key: string]: unknown;
+}
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+let starting: Promise<void> | null = null;
+
+async function isHealthy(): Promise<boolean> {
+    try {
+        const response = await fetch(`${WORKER_URL}/health`, { cache: 'no-store' });
+        return response.ok;
+    } catch {
+        return false;
+    }
+}
+
+// Starts the long-lived Python worker once and reuses it for every request
+export async function ensureWorker(): Promise<void> {
+    if (await isHealthy()) return;
+
+    if (!starting) {
+        starting = (async () => {
+            const workerProcess = spawn('python', [
+                'app/ml/worker.py',
+                '--port', WORKER_PORT.toString(),
+                '--uploads_dir', path.join(process.cwd(), 'uploads', 'jobs'),
+                '--output_dir', JOB_OUTPUT_DIR,
+                '--cache_dir', path.join(process.cwd(), 'uploads', '.model_cache')
+            ], { stdio: 'inherit' });
+            workerProcess.on('exit', (code) => {
+                console.error('Generation worker exited with code:', code);
+                starting = null;
+            });
+
+            const deadline = Date.now() + STARTUP_TIMEOUT_MS;
+            while (Date.now() < deadline) {
+                await sleep(500);
+                if (await isHealthy()) return;
+            }
+            throw new Error('Generation worker did not start in time');
+        })().catch((error) => {
+            starting = null;
+            throw error;
+        });
+    }
+    await starting;
+}
+
+export async function submitJob(file: Blob, filename: string, numSamples: number): Promise<GenerationJob> {
+    await ensureWorker();
+    const params = new URLSearchParams({ samples: numSamples.toString(), filename });
+    const response = await fetch(`${WORKER_URL}/jobs?${params}`, {
+        method: 'POST',
+        body: new Uint8Array(await file.arrayBuffer()),
+    });
+    const payload = await response.json();
+    if (!response.ok) {
+        throw new Error(payload.error || 'Failed to submit generation job');
+    }
+    return payload;
+}
+
+export async function getJob(jobId: string): Promise<GenerationJob | null> {
+    await ensureWorker();
+    const response = await fetch(`${WORKER_URL}/jobs/${encodeURIComponent(jobId)}`, { cache: 'no-store' });
+    if (response.status === 404) return null;
+    return response.json();
+}
+
+export async function getJobEvents(jobId: string, since = 0): Promise<{ events: GenerationEvent[]; next: number } | null> {
+    await ensureWorker();
+    const response = await fetch(`${WORKER_URL}/jobs/${encodeURIComponent(jobId)}/events?since=${since}`, { cache: 'no-store' });
+    if (response.status === 404) return null;
+    return response.json();
+}
+
+export async function waitForJob(jobId: string, pollMs = 500): Promise<GenerationJob> {
+    while (true) {
+        const job = await getJob(jobId);
+        if (!job) throw new Error(`Unknown generation job: ${jobId}`);
+        if (job.status === 'done' || job.status === 'failed') return job;
+        await sleep(pollMs);
+    }
+}
+
+const JOB_ID = /^[A-Za-z0-9_-]+$/;
+
+// Output names come from the uploaded file name, so only require a single path segment
+function isFileName(name: string): boolean {
+    return name !== '' && name !== '.' && name !== '..' && !/[\\/\0]/.test(name);
+}
+
+// Absolute path of a job's output file, or null if the names are invalid or the file does not exist
+export function jobFilePath(jobId: string, name: string): string | null {
+    if (!JOB_ID.test(jobId) || !isFileName(name)) return null;
+    const filePath = path.join(JOB_OUTPUT_DIR, jobId, name);
+    return existsSync(filePath) ? filePath : null;
+}
+
+export function jobFileUrl(jobId: string, name: string): string {
+    return `/api/jobs/${encodeURIComponent(jobId)}/files/${encodeURIComponent(name)}`;
+}
+
+// URLs of a finished job's files (served by /api/jobs/<id>/files/<name>)
+export function jobUrls(job: GenerationJob) {
+    const url = (name?: string) => (name ? jobFileUrl(job.id, name) : '');
+    return {
+        syntheticData: job.output ? jobFileUrl(job.id, job.output) : null,
+        visualizations: {
+            distributions: url(job.visualizations.distributions),
+            correlations: url(job.visualizations.correlations),
+            bic_aic: url(job.visualizations.bic_aic)
+        }
+    };
+}